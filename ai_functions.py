@@ -4,143 +4,494 @@ Three specialized AI functions for different tasks.
 """
 
 import requests
-import json
+import orjson
+import pytz
 import logging
-from typing import Dict, Optional
-from datetime import datetime
+import re
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Dict, List, Optional, TypedDict
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from config import Config
+from cache import LRUCache
+from database import Expense, Income
 
 logger = logging.getLogger(__name__)
 
+# Shared HTTP session: keeps TLS connections to the DeepSeek API alive between calls
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=Config.DEEPSEEK_POOL_SIZE,
+    pool_maxsize=Config.DEEPSEEK_POOL_SIZE,
+    # Chat completions have no side effects, so POST is safe to retry on 429/5xx.
+    # Read timeouts are not retried: each retry would wait the full generation
+    # timeout again and pay for the completion again
+    max_retries=Retry(
+        total=3,
+        read=False,
+        backoff_factor=0.5,
+        # Jitter spreads retries from concurrent users; the cap bounds each backoff
+        # sleep. Only connects and 429/5xx are retried, so a stalled call costs
+        # one read timeout at most
+        backoff_jitter=0.3,
+        backoff_max=2,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"],
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+))
+_SESSION.headers.update({
+    "Authorization": f"Bearer {Config.DEEPSEEK_API_KEY}",
+    "Content-Type": "application/json"
+})
 
-def deepseek_ai_expense(text: str, lang: str = "en") -> Dict:
+# Worker pool for callers that want to fan out several DeepSeek calls at once;
+# sized to the connection pool so every worker can hold a keep-alive connection
+_EXECUTOR = ThreadPoolExecutor(max_workers=Config.DEEPSEEK_POOL_SIZE, thread_name_prefix="deepseek")
+
+# Successful expense extractions keyed on (normalized text, lang)
+_expense_cache = LRUCache(maxsize=4096)
+_WHITESPACE_RE = re.compile(r"\s+")
+# Text with no letter or digit (empty, whitespace, punctuation, emoji) is never worth an API call
+_WORD_CHAR_RE = re.compile(r"\w")
+# Detected timezones keyed on normalized country text; a country's zone
+# practically never changes, so entries live for a day
+_country_cache = LRUCache(maxsize=4096, ttl=86400)
+# Cached for unrecognizable input so repeated garbage is not re-sent to the API;
+# kept short because a transient model miss should not stick for a day
+_COUNTRY_NOT_FOUND = object()
+_COUNTRY_NEGATIVE_TTL = 600
+_VALID_TIMEZONES = frozenset(pytz.all_timezones)
+# API-resolved reminder times keyed on (normalized text, timezone, minute, lang);
+# the minute is part of the key, so entries only need to outlive it briefly
+_reminder_cache = LRUCache(maxsize=4096, ttl=120)
+_REMINDER_NOT_FOUND = object()
+_REMINDER_NEGATIVE_TTL = 30
+
+# Keyword tables for the manual (non-AI) fallback extraction
+_CATEGORY_KEYWORDS = {
+    "Food": ("burger", "food", "restaurant", "eat", "meal", "pizza", "osh", "non", "taom", "еда", "ресторан", "lunch", "dinner", "breakfast"),
+    "Transport": ("taxi", "bus", "train", "transport", "taksi", "avtobus", "mashina", "такси", "автобус"),
+    "Entertainment": ("cinema", "movie", "game", "entertainment", "kino", "o'yin", "кино", "игра"),
+    "Education": ("book", "course", "education", "kitob", "kurs", "ta'lim", "книга", "курс"),
+    "Health": ("doctor", "medicine", "hospital", "health", "doktor", "dori", "shifoxona", "доктор", "лекарство"),
+    "Electronics": ("phone", "computer", "electronic", "telefon", "kompyuter", "телефон", "компьютер"),
+}
+_CURRENCY_KEYWORDS = {
+    "CNY": ("yuan", "rmb", "cny", "¥"),
+    "USD": ("dollar", "usd", "$"),
+    "EUR": ("euro", "eur", "€"),
+    "RUB": ("ruble", "rubl", "rub", "₽"),
+    "UZS": ("som", "so'm", "uzs"),
+}
+_INCOME_DAILY_KEYWORDS = ("daily", "per day", "each day", "kunlik", "har kuni", "дневной", "каждый день")
+
+# Normalizes currency names/symbols returned by the model to ISO codes (read-only)
+_CURRENCY_MAP = MappingProxyType({
+    "YUAN": "CNY", "RMB": "CNY", "CN¥": "CNY", "¥": "CNY",
+    "DOLLAR": "USD", "DOLLARS": "USD", "$": "USD", "US$": "USD",
+    "EURO": "EUR", "EUROS": "EUR", "€": "EUR",
+    "RUBLE": "RUB", "RUBLES": "RUB", "RUBL": "RUB", "₽": "RUB",
+    "SOM": "UZS", "SO'M": "UZS", "UZS": "UZS"
+})
+
+
+def _keyword_pattern(groups: Dict, whole_words: bool = False) -> re.Pattern:
     """
-    DeepSeek_AI_1: Specialized for expense extraction and categorization.
+    Compile {name: keywords} into one alternation with a named group per name.
     
-    Args:
-        text: User's expense description
-        lang: User's language preference (uz, ru, en)
+    With whole_words, a word keyword only matches as a separate word (optionally
+    pluralized with "s"), so "eat" does not match inside "theater" and "dollar"
+    not inside "dollarstore". A digit may come right before it, so amounts like
+    "5usd" still count. Symbol keywords such as "$" match anywhere, including
+    "$5" and "5$".
+    """
+    def alternative(keyword: str) -> str:
+        if whole_words and _WORD_CHAR_RE.match(keyword):
+            return rf"(?<![^\W\d]){re.escape(keyword)}s?(?!\w)"
+        return re.escape(keyword)
     
-    Returns:
-        Dictionary with amount, category, description, currency, and advice
+    return re.compile("|".join(
+        f"(?P<{name}>{'|'.join(map(alternative, keywords))})" for name, keywords in groups.items()
+    ))
+
+
+# One C-level scan per concern; the matching group name is the result
+_CATEGORY_RE = _keyword_pattern(_CATEGORY_KEYWORDS)
+_CATEGORY_WORD_RE = _keyword_pattern(_CATEGORY_KEYWORDS, whole_words=True)
+_CURRENCY_WORD_RE = _keyword_pattern(_CURRENCY_KEYWORDS, whole_words=True)
+_INCOME_DAILY_RE = re.compile("|".join(map(re.escape, _INCOME_DAILY_KEYWORDS)))
+_NUM_RE = re.compile(r"\d+(?:\.\d+)?")
+# Body of a ```json ... ``` (or bare ```) markdown block
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+
+# Reminder fast path: "in 15 minutes", "через 2 часа", "спустя 3 дня",
+# "yana 10 daqiqa", "30 daqiqadan keyin", "in 2h",
+# "tomorrow 9am", "завтра в 14:30" and explicit "YYYY-MM-DD HH:MM[:SS]" are
+# resolved without calling the API
+# Single-letter units ("2h", "3ч") must stand alone so "2 hafta" is not read as hours
+_REMINDER_UNIT = r"(minutes?|mins?|hours?|hrs?|h(?!\w)|days?|минут[уы]?|мин|час(?:а|ов)?|ч(?!\w)|день|дня|дней|суток|daqiqa|minut|soat|kun)"
+_RELATIVE_PREFIX_RE = re.compile(r"(?<!\w)(?:in|after|через|спустя|yana)\s+(\d+)\s*" + _REMINDER_UNIT, re.IGNORECASE)
+_RELATIVE_SUFFIX_RE = re.compile(r"\b(\d+)\s*" + _REMINDER_UNIT + r"\w*\s+(?:keyin|so'ng|later)\b", re.IGNORECASE)
+_REMINDER_AMOUNT_RE = re.compile(r"\d+\s*" + _REMINDER_UNIT, re.IGNORECASE)
+_ISO_DATETIME_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})[ T](\d{1,2}):(\d{2})(?::(\d{2}))?\b")
+_REMINDER_UNIT_STEMS = (
+    (("min", "мин", "daqiqa"), "minutes"),
+    (("h", "час", "ч", "soat"), "hours"),
+    (("day", "ден", "дн", "сут", "kun"), "days"),
+)
+_REMINDER_DAY_OFFSETS = {
+    "today": 0, "bugun": 0, "сегодня": 0,
+    "tomorrow": 1, "ertaga": 1, "завтра": 1,
+    "indinga": 2, "послезавтра": 2,
+}
+_REMINDER_DAY_RE = re.compile(
+    r"(?<!\w)(" + "|".join(_REMINDER_DAY_OFFSETS) + r")(?!\w)", re.IGNORECASE
+)
+# "9am", "9:30 pm" or a 24-hour "14:30"; a bare number is too ambiguous
+_CLOCK_RE = re.compile(
+    r"(?<![\d:])(\d{1,2})(?::(\d{2}))?\s*(am|pm)(?!\w)|(?<![\d:])(\d{1,2}):(\d{2})(?![\d:])", re.IGNORECASE
+)
+# Bare-hour clock phrases ("at 9", "в 9", "soat 9 da", "9 o'clock"); too vague to
+# parse locally, but they mean a relative offset in the same text is not the whole time
+_CLOCK_HINT_RE = re.compile(
+    r"(?<!\w)(?:at|в|soat)\s+\d{1,2}(?!\d)|(?<![\w:])\d{1,2}\s*(?:o'clock|da)(?!\w)", re.IGNORECASE
+)
+
+
+class _CircuitBreaker:
+    """Stops calling DeepSeek for a while after repeated failures in a short window."""
+
+    def __init__(self, max_failures: int = 5, window: float = 30.0, cooldown: float = 60.0):
+        self.max_failures = max_failures
+        self.window = window
+        self.cooldown = cooldown
+        self._failures = []
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        return time.monotonic() < self._open_until
+
+    def record_success(self):
+        with self._lock:
+            self._failures.clear()
+
+    def record_failure(self):
+        now = time.monotonic()
+        with self._lock:
+            self._failures = [t for t in self._failures if now - t < self.window]
+            self._failures.append(now)
+            if len(self._failures) > self.max_failures:
+                self._open_until = now + self.cooldown
+                self._failures.clear()
+                logger.warning(f"DeepSeek API failing repeatedly, pausing calls for {self.cooldown:.0f}s")
+
+
+_BREAKER = _CircuitBreaker()
+
+
+def _is_number(value) -> bool:
+    """True for a JSON number or a plain numeric string such as "12.5"."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return True
+    return isinstance(value, str) and _NUM_RE.fullmatch(value.strip()) is not None
+
+
+def _coerce_amount(value) -> float:
+    """Amount from model JSON as float; 0.0 for anything that is not a plain number."""
+    return float(value) if _is_number(value) else 0.0
+
+
+def _normalize_currency(raw, default: str) -> str:
+    """ISO code for a currency name/symbol from the model; default for missing or implausible values."""
+    if not isinstance(raw, str):
+        return default
+    raw = raw.strip().upper()
+    if not raw:
+        return default
+    return _CURRENCY_MAP.get(raw, raw if len(raw) <= 5 else default)
+
+
+def close_session():
+    """Close pooled DeepSeek connections and the worker pool. Called on bot shutdown."""
+    _EXECUTOR.shutdown(wait=False)
+    _SESSION.close()
+
+
+def _post_chat(payload: Dict, timeout: int = 30, stream: bool = False) -> requests.Response:
+    """
+    POST a chat completion payload to DeepSeek, serialized with orjson.
+    
+    Raises requests.ConnectionError without touching the network while the
+    circuit breaker is open, so callers fall through to their manual fallbacks.
     """
-    prompts = {
-        "uz": f"""Quyidagi xarajatni tahlil qiling va quyidagi formatda JSON javob bering:
-{{
+    if _BREAKER.is_open():
+        raise requests.ConnectionError("DeepSeek API temporarily disabled after repeated failures")
+    
+    try:
+        response = _SESSION.post(
+            Config.DEEPSEEK_API_URL,
+            data=orjson.dumps(payload),
+            # Fail fast on an unreachable host; allow the full timeout for generation
+            timeout=(Config.DEEPSEEK_CONNECT_TIMEOUT, timeout),
+            stream=stream
+        )
+    except requests.RequestException:
+        _BREAKER.record_failure()
+        raise
+    
+    if response.status_code == 429 or response.status_code >= 500:
+        _BREAKER.record_failure()
+    else:
+        _BREAKER.record_success()
+    return response
+
+
+def _response_content(response: requests.Response) -> str:
+    """Return the assistant message text from a chat completion response."""
+    choices = orjson.loads(response.content).get("choices") or [{}]
+    return choices[0].get("message", {}).get("content") or ""
+
+
+def _parse_json_content(content: str):
+    """Decode model JSON, unwrapping a ```json fence if present. Raises orjson.JSONDecodeError."""
+    match = _FENCE_RE.search(content)
+    return orjson.loads(match.group(1) if match else content.strip())
+
+
+def _chat_payload(system: str, user: str, temperature: float, **options) -> Dict:
+    """Build a deepseek-chat payload: static system prompt first, per-request user turn last."""
+    return {
+        "model": "deepseek-chat",
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user}
+        ],
+        "temperature": temperature,
+        **options
+    }
+
+
+def _chat(system: str, user: str, *, temperature: float, label: str, timeout: int = 30, **options) -> Optional[str]:
+    """
+    Run one chat completion and return the assistant text.
+    
+    Returns None (and logs) on a non-200 status; network errors propagate so
+    each caller keeps its own fallback.
+    """
+    response = _post_chat(_chat_payload(system, user, temperature, **options), timeout=timeout)
+    if response.status_code != 200:
+        logger.error(f"DeepSeek API error in {label}: {response.status_code}")
+        return None
+    return _response_content(response)
+
+
+def _stream_content(response: requests.Response, stop: Optional[str] = None,
+                    on_text: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Accumulate assistant text from a streamed (SSE) chat completion.
+    
+    Stops reading as soon as the text contains stop, leaving the rest of
+    the generation unread; the caller closes the response. on_text, if
+    given, receives the text so far after each chunk.
+    """
+    content = ""
+    for line in response.iter_lines():
+        if not line.startswith(b"data:"):
+            continue
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            break
+        choices = orjson.loads(data).get("choices") or [{}]
+        delta = choices[0].get("delta", {}).get("content") or ""
+        content += delta
+        if on_text and delta:
+            on_text(content)
+        # Only the newly added tail can complete the stop marker
+        if stop and stop in content[-(len(stop) + len(delta)):]:
+            break
+    return content
+
+
+# Static expense instructions live in the system message so the prompt
+# prefix is identical across requests and can be cached by DeepSeek
+_EXPENSE_SYSTEM = "You extract one expense (amount, currency, category, description) from the user's message. Detect the currency from the text itself (USD, EUR, CNY/RMB/Yuan, RUB, UZS/so'm, ...); if none is mentioned, use USD. Respond with a single JSON object, no prose."
+
+_EXPENSE_INSTRUCTIONS = {
+    "uz": """Foydalanuvchi xabaridagi xarajatni tahlil qiling va quyidagi formatda JSON javob bering:
+{
     "amount": <raqam>,
     "currency": "<valyuta>",
     "category": "<kategoriya>",
     "description": "<tavsif>",
     "advice": "<tavsiya yoki bo'sh string>"
-}}
+}
 
 MUHIM: Valyutani matndan aniqlang (masalan: USD, EUR, CNY, RMB, Yuan, Dollar, Euro, so'm, rubl, va hokazo). Agar valyuta ko'rsatilmagan bo'lsa, "USD" dan foydalaning.
 
-Kategoriyalar: Food, Transport, Entertainment, Education, Health, Electronics, Shopping, Bills, Other
-Xarajat: {text}""",
-        "ru": f"""Проанализируйте следующий расход и верните JSON ответ в следующем формате:
-{{
+Kategoriyalar: Food, Transport, Entertainment, Education, Health, Electronics, Shopping, Bills, Other""",
+    "ru": """Проанализируйте расход из сообщения пользователя и верните JSON ответ в следующем формате:
+{
     "amount": <число>,
     "currency": "<валюта>",
     "category": "<категория>",
     "description": "<описание>",
     "advice": "<совет или пустая строка>"
-}}
+}
 
 ВАЖНО: Определите валюту из текста (например: USD, EUR, CNY, RMB, Yuan, Dollar, Euro, доллар, юань, рубль и т.д.). Если валюта не указана, используйте "USD".
 
-Категории: Food, Transport, Entertainment, Education, Health, Electronics, Shopping, Bills, Other
-Расход: {text}""",
-        "en": f"""Analyze the following expense and return a JSON response in the following format:
-{{
+Категории: Food, Transport, Entertainment, Education, Health, Electronics, Shopping, Bills, Other""",
+    "en": """Analyze the expense in the user's message and return a JSON response in the following format:
+{
     "amount": <number>,
     "currency": "<currency>",
     "category": "<category>",
     "description": "<description>",
     "advice": "<advice or empty string>"
-}}
+}
 
 IMPORTANT: Detect the currency from the text (e.g., USD, EUR, CNY, RMB, Yuan, Dollar, Euro, dollars, yuan, etc.). If no currency is mentioned, use "USD".
 
-Categories: Food, Transport, Entertainment, Education, Health, Electronics, Shopping, Bills, Other
-Expense: {text}"""
+Categories: Food, Transport, Entertainment, Education, Health, Electronics, Shopping, Bills, Other"""
+}
+
+_EXPENSE_SYSTEM_PROMPTS = {
+    lang: f"{_EXPENSE_SYSTEM}\n\n{instructions}" for lang, instructions in _EXPENSE_INSTRUCTIONS.items()
+}
+
+
+class ExpenseData(TypedDict):
+    """Expense fields extracted from a user message."""
+    amount: float
+    currency: str
+    category: str
+    description: str
+    advice: str
+
+
+_ADVICE_KEY = '"advice"'
+
+
+def _try_fast_extract(text: str) -> Optional[ExpenseData]:
+    """
+    Extract trivially simple expenses ("taxi 5 usd") without calling DeepSeek.
+    
+    Returns None unless the text has exactly one number, one whole-word currency
+    (or currency symbol) and one whole-word category keyword; anything ambiguous
+    goes to the API.
+    """
+    numbers = _NUM_RE.findall(text)
+    if len(numbers) != 1:
+        return None
+    amount = float(numbers[0])
+    
+    text_lower = text.casefold()
+    currencies = {match.lastgroup for match in _CURRENCY_WORD_RE.finditer(text_lower)}
+    categories = {match.lastgroup for match in _CATEGORY_WORD_RE.finditer(text_lower)}
+    if amount <= 0 or len(currencies) != 1 or len(categories) != 1:
+        return None
+    
+    return {
+        "amount": amount,
+        "currency": currencies.pop(),
+        "category": categories.pop(),
+        "description": text.strip(),
+        "advice": ""
     }
+
+
+def _parse_expense_json(content: str, text: str) -> ExpenseData:
+    """
+    Normalize the model's JSON expense object.
     
-    prompt = prompts.get(lang, prompts["en"])
+    Raises ValueError (orjson.JSONDecodeError is one) on bad JSON or when the
+    object has no numeric amount, e.g. after a cut stream lost it.
+    """
+    result = _parse_json_content(content)
+    if not isinstance(result, dict) or not _is_number(result.get("amount")):
+        raise ValueError(f"no numeric amount in expense JSON: {content!r}")
+    
+    return {
+        "amount": _coerce_amount(result.get("amount")),
+        "currency": _normalize_currency(result.get("currency"), "USD"),
+        "category": result.get("category", "Other"),
+        "description": result.get("description", text),
+        "advice": result.get("advice", "")
+    }
+
+
+def deepseek_ai_expense(text: str, lang: str = "en") -> ExpenseData:
+    """
+    DeepSeek_AI_1: Specialized for expense extraction and categorization.
+    
+    Args:
+        text: User's expense description
+        lang: User's language preference (uz, ru, en)
+    
+    Returns:
+        Dictionary with amount, category, description, currency, and advice
+    """
+    if not _WORD_CHAR_RE.search(text or ""):
+        return _extract_expense_manually(text or "", lang)
+    
+    cache_key = (_WHITESPACE_RE.sub(" ", text.strip().casefold()), lang)
+    cached = _expense_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached)
+    
+    fast = _try_fast_extract(text)
+    if fast is not None:
+        return fast
     
     try:
-        headers = {
-            "Authorization": f"Bearer {Config.DEEPSEEK_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        system_prompt = _EXPENSE_SYSTEM_PROMPTS.get(lang, _EXPENSE_SYSTEM_PROMPTS["en"])
+        payload = _chat_payload(system_prompt, text, 0.3, response_format={"type": "json_object"})
         
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": "You are DeepSeek_AI_1 - specialized for expense extraction and categorization. CRITICAL: Each request is completely independent - do NOT use any context from previous requests. Your ONLY job is to extract expense information (amount, currency, category, description) from the CURRENT user message and return valid JSON. You MUST detect the currency from the text itself (USD, EUR, CNY, RMB, Yuan, Dollar, Euro, etc.). If no currency is mentioned, default to USD. You do NOT add expenses to database - you only extract information for confirmation."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.3
-        }
+        # Streamed so reading can stop once "advice" begins: it is generated
+        # last and the bot never shows it, so waiting for it only adds latency
+        with _post_chat(payload, timeout=30, stream=True) as response:
+            status_code = response.status_code
+            content = _stream_content(response, stop=_ADVICE_KEY) if status_code == 200 else ""
         
-        response = requests.post(
-            Config.DEEPSEEK_API_URL,
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
+        if status_code == 200:
+            advice_at = content.find(_ADVICE_KEY)
+            if advice_at != -1:
+                content = content[:advice_at].rstrip().rstrip(",") + "}"
             
-            # Try to extract JSON from response
             try:
-                # Remove markdown code blocks if present
-                if "```json" in content:
-                    content = content.split("```json")[1].split("```")[0].strip()
-                elif "```" in content:
-                    content = content.split("```")[1].split("```")[0].strip()
-                
-                result = json.loads(content)
-                
-                # Validate and set defaults
-                amount_value = result.get("amount")
-                if amount_value is None:
-                    amount = 0.0
-                else:
-                    try:
-                        amount = float(amount_value)
-                    except (ValueError, TypeError):
-                        amount = 0.0
-                
-                # Extract currency - normalize common variations
-                currency_raw = result.get("currency", "USD").upper().strip()
-                currency_map = {
-                    "YUAN": "CNY", "RMB": "CNY", "CN¥": "CNY", "¥": "CNY",
-                    "DOLLAR": "USD", "DOLLARS": "USD", "$": "USD", "US$": "USD",
-                    "EURO": "EUR", "EUROS": "EUR", "€": "EUR",
-                    "RUBLE": "RUB", "RUBLES": "RUB", "RUBL": "RUB", "₽": "RUB",
-                    "SOM": "UZS", "SO'M": "UZS", "UZS": "UZS"
-                }
-                currency = currency_map.get(currency_raw, currency_raw if len(currency_raw) <= 5 else "USD")
-                
-                category = result.get("category", "Other")
-                description = result.get("description", text)
-                advice = result.get("advice", "")
-                
-                return {
-                    "amount": amount,
-                    "currency": currency,
-                    "category": category,
-                    "description": description,
-                    "advice": advice
-                }
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON decode error in expense AI: {e}")
-                return _extract_expense_manually(text, lang)
+                expense = _parse_expense_json(content, text)
+            except ValueError as e:
+                if advice_at == -1:
+                    logger.error(f"Unusable JSON in expense AI: {e}")
+                    return _extract_expense_manually(text, lang)
+                # The cut lost the amount ("advice" came first or sat inside a
+                # value), so ask once more and read the complete object
+                logger.warning(f"Truncated expense JSON unusable, retrying without streaming: {e}")
+                content = _chat(
+                    system_prompt, text, temperature=0.3, label="expense AI",
+                    response_format={"type": "json_object"}
+                )
+                try:
+                    expense = _parse_expense_json(content or "", text)
+                except ValueError as e:
+                    logger.error(f"Unusable JSON in expense AI: {e}")
+                    return _extract_expense_manually(text, lang)
+            
+            # Only cache real extractions, never fallbacks or zero amounts
+            if expense["amount"] > 0:
+                _expense_cache.set(cache_key, expense)
+            return dict(expense)
         else:
-            logger.error(f"DeepSeek API error in expense AI: {response.status_code}")
+            logger.error(f"DeepSeek API error in expense AI: {status_code}")
             return _extract_expense_manually(text, lang)
     
     except Exception as e:
@@ -148,69 +499,31 @@ Expense: {text}"""
         return _extract_expense_manually(text, lang)
 
 
-def deepseek_ai_report(text: str, lang: str = "en", expenses_data: list = None, user_currency: str = "USD") -> str:
+def deepseek_ai_expense_future(text: str, lang: str = "en") -> Future:
+    """Run deepseek_ai_expense on the shared worker pool and return its Future."""
+    return _EXECUTOR.submit(deepseek_ai_expense, text, lang)
+
+
+def deepseek_ai_expense_batch(texts: List[str], lang: str = "en") -> List[ExpenseData]:
     """
-    DeepSeek_AI_data: Generate financial reports based on user queries.
-    
-    Args:
-        text: User's report query
-        lang: User's language preference
-        expenses_data: List of expense and/or income objects from database
-        user_currency: User's currency from User table (for display)
+    Extract several independent expense texts concurrently.
     
-    Returns:
-        Formatted report string
+    Requests run on the shared worker pool, so at most DEEPSEEK_POOL_SIZE are in
+    flight at once; results come back in input order. Do not call this from a
+    task already running on that pool.
     """
-    # Prepare context with expenses and incomes
-    from database import Expense, Income
-    
-    expenses_context = ""
-    if expenses_data:
-        # Separate expenses and incomes
-        expenses = [e for e in expenses_data if isinstance(e, Expense)]
-        incomes = [i for i in expenses_data if isinstance(i, Income)]
-        
-        expenses_context = "\n\nUser's financial data:\n"
-        
-        # Process expenses - use user's currency from User table
-        if expenses:
-            total_expenses = sum(e.amount for e in expenses)
-            categories = {}
-            for e in expenses:
-                cat = getattr(e, 'category', 'Other') or "Other"
-                categories[cat] = categories.get(cat, 0) + e.amount
-            
-            expenses_context += f"\nExpenses (total {len(expenses)} records):\n"
-            expenses_context += f"Total: {total_expenses:.2f} {user_currency}\n"
-            expenses_context += "By category:\n"
-            for cat, amount in categories.items():
-                expenses_context += f"- {cat}: {amount:.2f} {user_currency}\n"
-            expenses_context += "\nRecent expenses:\n"
-            for e in expenses[:10]:
-                date_str = e.date.strftime("%Y-%m-%d") if hasattr(e, 'date') and e.date else 'N/A'
-                category = getattr(e, 'category', 'Other') or 'Other'
-                description = getattr(e, 'description', '') or ''
-                expenses_context += f"- {date_str}: {e.amount:.2f} {user_currency} ({category}): {description}\n"
-        
-        # Process incomes - use user's currency from User table
-        if incomes and len(incomes) > 0:
-            total_incomes = sum(i.amount for i in incomes)
-            expenses_context += f"\nIncomes (total {len(incomes)} records):\n"
-            expenses_context += f"Total: {total_incomes:.2f} {user_currency}\n"
-            expenses_context += "Recent incomes:\n"
-            for i in incomes[:10]:
-                date_str = i.date.strftime("%Y-%m-%d") if hasattr(i, 'date') and i.date else 'N/A'
-                income_type = getattr(i, 'income_type', 'monthly') or 'monthly'
-                description = getattr(i, 'description', '') or ''
-                expenses_context += f"- {date_str}: {i.amount:.2f} {user_currency} ({income_type}): {description}\n"
-        
-        if not expenses and not incomes:
-            expenses_context += "\nUser has no financial data recorded yet."
-    else:
-        expenses_context = "\n\nUser has no financial data recorded yet."
-    
-    prompts = {
-        "uz": f"""Siz foydalanuvchining shaxsiy yordamchisisiz va uning ma'lumotlar bazasiga ulangansiz.
+    futures = [deepseek_ai_expense_future(text, lang) for text in texts]
+    return [future.result() for future in futures]
+
+
+_REPORT_LANG_NAMES = {
+    "uz": "Uzbek (O'zbek tili)",
+    "ru": "Russian (Русский)",
+    "en": "English"
+}
+
+_REPORT_INSTRUCTIONS = {
+    "uz": """Siz foydalanuvchining shaxsiy yordamchisisiz va uning ma'lumotlar bazasiga ulangansiz.
 Sizning vazifangiz: foydalanuvchi bilan uning xarajatlari va daromadlari haqida suhbatlashish, hisobotlar berish, savollarga javob berish.
 
 MUHIM: 
@@ -219,11 +532,8 @@ MUHIM:
 - Siz faqat mavjud ma'lumotlar haqida gapirasiz va hisobot berasiz
 - Hisobotda daromad va xarajatlarni taqqoslab, balansni ko'rsating
 
-Foydalanuvchi so'rovi: {text}
-{expenses_context}
-
 Javob bering va kerak bo'lsa, ma'lumotlar bazasidagi ma'lumotlardan foydalaning.""",
-        "ru": f"""Вы личный помощник пользователя, подключенный к его базе данных.
+    "ru": """Вы личный помощник пользователя, подключенный к его базе данных.
 Ваша задача: общаться с пользователем о его расходах и доходах, предоставлять отчеты, отвечать на вопросы.
 
 ВАЖНО:
@@ -232,11 +542,8 @@ Javob bering va kerak bo'lsa, ma'lumotlar bazasidagi ma'lumotlardan foydalaning.
 - Вы только обсуждаете существующие данные и предоставляете отчеты
 - В отчете сравнивайте доходы и расходы, показывайте баланс
 
-Запрос пользователя: {text}
-{expenses_context}
-
 Ответьте и при необходимости используйте данные из базы данных.""",
-        "en": f"""You are the user's personal assistant, connected to their database.
+    "en": """You are the user's personal assistant, connected to their database.
 Your task: chat with the user about their expenses and income, provide reports, answer questions.
 
 IMPORTANT:
@@ -245,50 +552,174 @@ IMPORTANT:
 - You only discuss existing data and provide reports
 - In reports, compare income and expenses, show balance
 
-User's query: {text}
-{expenses_context}
-
 Respond and use database information if relevant."""
+}
+
+_REPORT_SYSTEM_PROMPTS = {
+    lang: f"You are DeepSeek_AI_data - a personal assistant connected to the user's database. CRITICAL: You MUST respond ONLY in {_REPORT_LANG_NAMES[lang]} language. The user's language is {_REPORT_LANG_NAMES[lang]}. You can ONLY read and discuss existing records (expenses and income). You CANNOT add, modify, or delete any records. If the user wants to add records, direct them to use the appropriate function buttons. Your role is to provide reports, answer questions, compare income vs expenses, and give advice based on existing data. IMPORTANT: Do NOT use markdown formatting (no ##, **, __, `, etc.) - use plain text only. Use simple text formatting like dashes (-) for lists.\n\n{instructions}"
+    for lang, instructions in _REPORT_INSTRUCTIONS.items()
+}
+
+_REPORT_QUERY_LABELS = {
+    "uz": "Foydalanuvchi so'rovi",
+    "ru": "Запрос пользователя",
+    "en": "User's query"
+}
+
+
+# Output cap for reports; leaves room for Uzbek/Russian, which tokenize longer
+_REPORT_MAX_TOKENS = 800
+# Minimum seconds between partial-report callbacks (Telegram throttles message edits)
+_REPORT_PROGRESS_INTERVAL = 1.5
+# Longest description kept per report row; free-text notes would otherwise dominate the prompt
+_REPORT_DESCRIPTION_CHARS = 100
+# Largest categories itemized in the report data; the rest are summed into one entry
+_REPORT_TOP_CATEGORIES = 10
+
+
+def _report_row(record, label: str) -> list:
+    """Compact [date, amount, label(, description)] row for the report data."""
+    date_str = record.date.strftime("%Y-%m-%d") if getattr(record, 'date', None) else 'N/A'
+    row = [date_str, round(record.amount, 2), label]
+    description = (getattr(record, 'description', '') or '').strip()
+    if len(description) > _REPORT_DESCRIPTION_CHARS:
+        description = description[:_REPORT_DESCRIPTION_CHARS - 1] + "…"
+    if description:
+        row.append(description)
+    return row
+
+
+def _top_categories(by_category: Dict) -> Dict:
+    """Largest categories (rounded), with the remainder folded into one entry so the prompt stays bounded."""
+    ranked = sorted(by_category.items(), key=lambda item: item[1], reverse=True)
+    top = {cat: round(amount, 2) for cat, amount in ranked[:_REPORT_TOP_CATEGORIES]}
+    rest = ranked[_REPORT_TOP_CATEGORIES:]
+    if rest:
+        top[f"{len(rest)} other categories"] = round(sum(amount for _, amount in rest), 2)
+    return top
+
+
+def _summarize_records(records: list):
+    """
+    Split records into expenses and incomes and total them in a single pass.
+    
+    Returns (expenses, incomes, totals) with totals shaped like
+    Database.get_financial_summary.
+    """
+    expenses, incomes = [], []
+    total_expenses = total_incomes = 0.0
+    categories = defaultdict(float)
+    for record in records:
+        if isinstance(record, Expense):
+            expenses.append(record)
+            total_expenses += record.amount
+            categories[getattr(record, 'category', 'Other') or "Other"] += record.amount
+        elif isinstance(record, Income):
+            incomes.append(record)
+            total_incomes += record.amount
+    totals = {
+        "expense_count": len(expenses),
+        "expense_total": total_expenses,
+        "by_category": dict(categories),
+        "income_count": len(incomes),
+        "income_total": total_incomes
     }
+    return expenses, incomes, totals
+
+
+def _throttled(callback: Callable[[str], None], interval: float) -> Callable[[str], None]:
+    """Wrap callback so it runs at most once per interval; its errors are logged, not raised."""
+    last_call = [0.0]
     
-    prompt = prompts.get(lang, prompts["en"])
+    def wrapper(text: str):
+        now = time.monotonic()
+        if now - last_call[0] < interval:
+            return
+        last_call[0] = now
+        try:
+            callback(text)
+        except Exception as e:
+            logger.debug(f"Report progress callback failed: {e}")
     
-    try:
-        headers = {
-            "Authorization": f"Bearer {Config.DEEPSEEK_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        # Determine language name for system message
-        lang_names = {
-            "uz": "Uzbek (O'zbek tili)",
-            "ru": "Russian (Русский)",
-            "en": "English"
+    return wrapper
+
+
+def deepseek_ai_report(text: str, lang: str = "en", expenses_data: list = None, user_currency: str = "USD",
+                       summary: Optional[Dict] = None, on_progress: Optional[Callable[[str], None]] = None) -> str:
+    """
+    DeepSeek_AI_data: Generate financial reports based on user queries.
+    
+    Args:
+        text: User's report query
+        lang: User's language preference
+        expenses_data: List of expense and/or income objects from database
+        user_currency: User's currency from User table (for display)
+        summary: Precomputed totals from Database.get_financial_summary; when given,
+            expenses_data only needs the recent records shown to the model
+        on_progress: Called with the partial report text while it is generated
+            (throttled); when given, the response is streamed
+    
+    Returns:
+        Formatted report string
+    """
+    expenses, incomes, totals = _summarize_records(expenses_data or [])
+    if summary is None:
+        summary = totals
+    
+    # Compact JSON summary: fewer prompt tokens than labeled prose lines.
+    # Recent rows are [date, amount, category/type(, description)]
+    data = {"currency": user_currency}
+    
+    # Process expenses - use user's currency from User table
+    if summary["expense_count"]:
+        data["expenses"] = {
+            "count": summary["expense_count"],
+            "total": round(summary["expense_total"], 2),
+            "by_category": _top_categories(summary["by_category"]),
+            "recent": [
+                _report_row(e, getattr(e, 'category', 'Other') or 'Other') for e in expenses[:10]
+            ]
         }
-        lang_name = lang_names.get(lang, "English")
-        
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": f"You are DeepSeek_AI_data - a personal assistant connected to the user's database. CRITICAL: You MUST respond ONLY in {lang_name} language. The user's language is {lang_name}. You can ONLY read and discuss existing records (expenses and income). You CANNOT add, modify, or delete any records. If the user wants to add records, direct them to use the appropriate function buttons. Your role is to provide reports, answer questions, compare income vs expenses, and give advice based on existing data. IMPORTANT: Do NOT use markdown formatting (no ##, **, __, `, etc.) - use plain text only. Use simple text formatting like dashes (-) for lists."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7
+    
+    # Process incomes - use user's currency from User table
+    if summary["income_count"]:
+        data["incomes"] = {
+            "count": summary["income_count"],
+            "total": round(summary["income_total"], 2),
+            "recent": [
+                _report_row(i, getattr(i, 'income_type', 'monthly') or 'monthly') for i in incomes[:10]
+            ]
         }
+    
+    if summary["expense_count"] or summary["income_count"]:
+        expenses_context = "\n\nUser's financial data (JSON):\n" + orjson.dumps(data).decode()
+    else:
+        expenses_context = "\n\nUser has no financial data recorded yet."
+    
+    # Only the query and the user's data vary; they go last, in the user turn
+    query_label = _REPORT_QUERY_LABELS.get(lang, _REPORT_QUERY_LABELS["en"])
+    prompt = f"{query_label}: {text}\n{expenses_context}"
+    
+    system_prompt = _REPORT_SYSTEM_PROMPTS.get(lang, _REPORT_SYSTEM_PROMPTS["en"])
+    
+    try:
+        if on_progress is None:
+            content = _chat(system_prompt, prompt, temperature=0.7, label="report AI", max_tokens=_REPORT_MAX_TOKENS)
+        else:
+            # Streamed so the caller can show the report while it is being written
+            payload = _chat_payload(system_prompt, prompt, 0.7, max_tokens=_REPORT_MAX_TOKENS, stream=True)
+            with _post_chat(payload, timeout=30, stream=True) as response:
+                if response.status_code == 200:
+                    content = _stream_content(
+                        response, on_text=_throttled(on_progress, _REPORT_PROGRESS_INTERVAL)
+                    )
+                else:
+                    logger.error(f"DeepSeek API error in report AI: {response.status_code}")
+                    content = None
         
-        response = requests.post(
-            Config.DEEPSEEK_API_URL,
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
+        if content is not None:
             return content.strip()
         else:
-            logger.error(f"DeepSeek API error in report AI: {response.status_code}")
             return "Error generating report. Please try again."
     
     except Exception as e:
@@ -296,6 +727,81 @@ Respond and use database information if relevant."""
         return "Error generating report. Please try again."
 
 
+def deepseek_ai_report_future(text: str, lang: str = "en", expenses_data: list = None, user_currency: str = "USD",
+                              summary: Optional[Dict] = None,
+                              on_progress: Optional[Callable[[str], None]] = None) -> Future:
+    """Run deepseek_ai_report on the shared worker pool and return its Future."""
+    return _EXECUTOR.submit(deepseek_ai_report, text, lang, expenses_data, user_currency, summary, on_progress)
+
+
+_REMINDER_SYSTEM = "You extract the reminder time from the user's message as a local datetime (YYYY-MM-DD HH:MM:SS). Resolve relative times like 'in 30 minutes' or 'tomorrow 9am' from the current local time given below. Return only the datetime, or 'None' if no time is given."
+
+_REMINDER_INSTRUCTIONS = {
+    "uz": """Foydalanuvchi xabaridan vaqtni ajratib oling va ISO formatda qaytaring (YYYY-MM-DD HH:MM:SS).
+Agar vaqt topilmasa, None qaytaring.""",
+    "ru": """Извлеките время из сообщения пользователя и верните в формате ISO (YYYY-MM-DD HH:MM:SS).
+Если время не найдено, верните None.""",
+    "en": """Extract time from the user's message and return in ISO format (YYYY-MM-DD HH:MM:SS).
+If time is not found, return None."""
+}
+
+_REMINDER_SYSTEM_PROMPTS = {
+    lang: f"{_REMINDER_SYSTEM}\n\n{instructions}" for lang, instructions in _REMINDER_INSTRUCTIONS.items()
+}
+
+
+@lru_cache(maxsize=256)
+def _build_reminder_system(lang: str, user_timezone: str, current_time_str: str) -> str:
+    """Reminder system prompt: static instructions first, clock context at the end."""
+    return (
+        f"{_REMINDER_SYSTEM_PROMPTS.get(lang, _REMINDER_SYSTEM_PROMPTS['en'])}\n\n"
+        f"IMPORTANT: The user is in timezone {user_timezone}. Current local time: {current_time_str}."
+    )
+
+
+def _parse_reminder_locally(text: str, current_time: datetime) -> Optional[str]:
+    """Resolve simple relative, day + clock or ISO reminder times without the API, or return None."""
+    match = _RELATIVE_PREFIX_RE.search(text) or _RELATIVE_SUFFIX_RE.search(text)
+    if match:
+        # Compound durations ("in 2 hours 30 minutes") are left to the API
+        if len(_REMINDER_AMOUNT_RE.findall(text)) > 1:
+            return None
+        # So is an offset mixed with a clock time or date ("in 2 days at 10:00")
+        if (_CLOCK_RE.search(text) or _CLOCK_HINT_RE.search(text)
+                or _REMINDER_DAY_RE.search(text) or _ISO_DATETIME_RE.search(text)):
+            return None
+        amount, unit = int(match.group(1)), match.group(2).lower()
+        for stems, field in _REMINDER_UNIT_STEMS:
+            if unit.startswith(stems):
+                return (current_time + timedelta(**{field: amount})).strftime("%Y-%m-%d %H:%M:%S")
+        return None
+    
+    match = _ISO_DATETIME_RE.search(text)
+    if match:
+        year, month, day, hour, minute, second = (int(g or 0) for g in match.groups())
+        try:
+            return datetime(year, month, day, hour, minute, second).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return None
+    
+    days = _REMINDER_DAY_RE.findall(text)
+    clocks = _CLOCK_RE.findall(text)
+    if len(days) == 1 and len(clocks) == 1:
+        hour_12, minute_12, meridiem, hour_24, minute_24 = clocks[0]
+        if meridiem:
+            hour, minute = int(hour_12), int(minute_12 or 0)
+            if not 1 <= hour <= 12:
+                return None
+            hour = hour % 12 + (12 if meridiem.lower() == "pm" else 0)
+        else:
+            hour, minute = int(hour_24), int(minute_24)
+        if hour > 23 or minute > 59:
+            return None
+        target = current_time + timedelta(days=_REMINDER_DAY_OFFSETS[days[0].lower()])
+        return target.replace(hour=hour, minute=minute, second=0, microsecond=0).strftime("%Y-%m-%d %H:%M:%S")
+    return None
+
+
 def deepseek_ai_reminder(text: str, lang: str = "en", user_timezone: str = "UTC", current_time: datetime = None) -> Optional[str]:
     """
     DeepSeek_AI_2: Specialized for reminder time extraction.
@@ -309,58 +815,42 @@ def deepseek_ai_reminder(text: str, lang: str = "en", user_timezone: str = "UTC"
     Returns:
         ISO format datetime string or None
     """
-    prompts = {
-        "uz": f"""Quyidagi matndan vaqtni ajratib oling va ISO formatda qaytaring (YYYY-MM-DD HH:MM:SS):
-Matn: {text}
-Agar vaqt topilmasa, None qaytaring.""",
-        "ru": f"""Извлеките время из следующего текста и верните в формате ISO (YYYY-MM-DD HH:MM:SS):
-Текст: {text}
-Если время не найдено, верните None.""",
-        "en": f"""Extract time from the following text and return in ISO format (YYYY-MM-DD HH:MM:SS):
-Text: {text}
-If time is not found, return None."""
-    }
-    
-    prompt = prompts.get(lang, prompts["en"])
+    if not _WORD_CHAR_RE.search(text or ""):
+        return None
     
     try:
-        headers = {
-            "Authorization": f"Bearer {Config.DEEPSEEK_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
         # Get current time in user's timezone for context
-        if current_time:
-            current_time_str = current_time.strftime("%Y-%m-%d %H:%M:%S")
-        else:
-            current_time_str = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        if not current_time:
+            current_time = datetime.now(timezone.utc)
         
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": f"You are DeepSeek_AI_2 - specialized for reminder time extraction. Your ONLY job is to extract time/date information from user messages and return ISO format datetime string (YYYY-MM-DD HH:MM:SS). IMPORTANT: The user is in timezone {user_timezone}. Current local time: {current_time_str}. For relative times like 'after 15 minutes', 'in 30 minutes', calculate the actual future datetime from the current local time. Return only the ISO datetime string or 'None' if time cannot be extracted."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.3
-        }
+        # Common phrasings are resolved locally; only the rest go to the API
+        local_result = _parse_reminder_locally(text, current_time)
+        if local_result:
+            return local_result
         
-        response = requests.post(
-            Config.DEEPSEEK_API_URL,
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
+        # Minute precision lets concurrent users in one timezone share the prompt
+        current_time_str = current_time.strftime("%Y-%m-%d %H:%M:00")
+        cache_key = (_WHITESPACE_RE.sub(" ", text.strip().casefold()), user_timezone, current_time_str, lang)
+        cached = _reminder_cache.get(cache_key)
+        if cached is _REMINDER_NOT_FOUND:
+            return None
+        if cached is not None:
+            return cached
+        
+        system_prompt = _build_reminder_system(lang, user_timezone, current_time_str)
+        
+        content = _chat(system_prompt, text, temperature=0.3, label="reminder AI")
         
-        if response.status_code == 200:
-            data = response.json()
-            content = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
+        if content is not None:
+            content = content.strip()
             
             if content.lower() == "none" or not content:
+                _reminder_cache.set(cache_key, _REMINDER_NOT_FOUND, ttl=_REMINDER_NEGATIVE_TTL)
                 return None
             
+            _reminder_cache.set(cache_key, content)
             return content
         else:
-            logger.error(f"DeepSeek API error in reminder AI: {response.status_code}")
             return None
     
     except Exception as e:
@@ -368,102 +858,101 @@ If time is not found, return None."""
         return None
 
 
-def deepseek_ai_expense_multiple(text: str, lang: str = "en", default_currency: str = "USD") -> list:
-    """
-    DeepSeek_AI_1: Extract multiple expenses from a single message.
-    
-    Args:
-        text: User's expense description (may contain multiple expenses)
-        lang: User's language preference
-        default_currency: Default currency if not specified
-    
-    Returns:
-        List of expense dictionaries
-    """
-    prompts = {
-        "uz": f"""Quyidagi matndan BARCHA xarajatlarni ajratib oling va JSON array formatida javob bering:
+def deepseek_ai_reminder_future(text: str, lang: str = "en", user_timezone: str = "UTC", current_time: datetime = None) -> Future:
+    """Run deepseek_ai_reminder on the shared worker pool and return its Future."""
+    return _EXECUTOR.submit(deepseek_ai_reminder, text, lang, user_timezone, current_time)
+
+
+_EXPENSE_MULTIPLE_SYSTEM = "You extract ALL expenses from the user's message as a JSON array with one object (amount, currency, category, description) per expense. Always return an array, even for a single expense. Detect each currency from the text; otherwise use the default currency given at the end of the message. Return ONLY the JSON array."
+
+_EXPENSE_MULTIPLE_INSTRUCTIONS = {
+    "uz": """Quyidagi matndan BARCHA xarajatlarni ajratib oling va JSON array formatida javob bering:
 [
-    {{
+    {
         "amount": <raqam>,
         "currency": "<valyuta>",
         "category": "<kategoriya>",
         "description": "<tavsif>"
-    }},
+    },
     ...
 ]
 
 MUHIM: Agar bir nechta xarajat bo'lsa, ularni alohida ajratib oling. Valyutani har bir xarajat uchun alohida aniqlang.
 
-Kategoriyalar: Food, Transport, Entertainment, Education, Health, Electronics, Shopping, Bills, Other
-Matn: {text}""",
-        "ru": f"""Извлеките ВСЕ расходы из следующего текста и верните JSON массив:
+Kategoriyalar: Food, Transport, Entertainment, Education, Health, Electronics, Shopping, Bills, Other""",
+    "ru": """Извлеките ВСЕ расходы из следующего текста и верните JSON массив:
 [
-    {{
+    {
         "amount": <число>,
         "currency": "<валюта>",
         "category": "<категория>",
         "description": "<описание>"
-    }},
+    },
     ...
 ]
 
 ВАЖНО: Если есть несколько расходов, разделите их отдельно. Определите валюту для каждого расхода отдельно.
 
-Категории: Food, Transport, Entertainment, Education, Health, Electronics, Shopping, Bills, Other
-Текст: {text}""",
-        "en": f"""Extract ALL expenses from the following text and return a JSON array:
+Категории: Food, Transport, Entertainment, Education, Health, Electronics, Shopping, Bills, Other""",
+    "en": """Extract ALL expenses from the following text and return a JSON array:
 [
-    {{
+    {
         "amount": <number>,
         "currency": "<currency>",
         "category": "<category>",
         "description": "<description>"
-    }},
+    },
     ...
 ]
 
 IMPORTANT: If there are multiple expenses, separate them individually. Detect currency for each expense separately.
 
-Categories: Food, Transport, Entertainment, Education, Health, Electronics, Shopping, Bills, Other
-Text: {text}"""
-    }
+Categories: Food, Transport, Entertainment, Education, Health, Electronics, Shopping, Bills, Other"""
+}
+
+_EXPENSE_MULTIPLE_SYSTEM_PROMPTS = {
+    lang: f"{_EXPENSE_MULTIPLE_SYSTEM}\n\n{instructions}" for lang, instructions in _EXPENSE_MULTIPLE_INSTRUCTIONS.items()
+}
+
+# Per-request user turns: the text, then the default currency last
+_EXTRACTION_USER_TEMPLATES = {
+    "uz": "Matn: {text}\n\nStandart valyuta: {default_currency}",
+    "ru": "Текст: {text}\n\nВалюта по умолчанию: {default_currency}",
+    "en": "Text: {text}\n\nDefault currency: {default_currency}"
+}
+
+
+def deepseek_ai_expense_multiple(text: str, lang: str = "en", default_currency: str = "USD") -> list:
+    """
+    DeepSeek_AI_1: Extract multiple expenses from a single message.
+    
+    Args:
+        text: User's expense description (may contain multiple expenses)
+        lang: User's language preference
+        default_currency: Default currency if not specified
+    
+    Returns:
+        List of expense dictionaries
+    """
+    if not _WORD_CHAR_RE.search(text or ""):
+        return []
+    
+    # A single unambiguous expense needs no model call
+    fast = _try_fast_extract(text)
+    if fast is not None:
+        return [{key: fast[key] for key in ("amount", "currency", "category", "description")}]
     
-    prompt = prompts.get(lang, prompts["en"])
+    prompt = _EXTRACTION_USER_TEMPLATES.get(lang, _EXTRACTION_USER_TEMPLATES["en"]).format(text=text, default_currency=default_currency)
     
     try:
-        headers = {
-            "Authorization": f"Bearer {Config.DEEPSEEK_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": f"You are DeepSeek_AI_1 - specialized for expense extraction. Extract ALL expenses from the user's message. If there are multiple expenses, return a JSON array with each expense as a separate object. Each expense must have: amount, currency (detect from text or use {default_currency}), category, and description. Return ONLY valid JSON array."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.3
-        }
-        
-        response = requests.post(
-            Config.DEEPSEEK_API_URL,
-            headers=headers,
-            json=payload,
-            timeout=30
+        content = _chat(
+            _EXPENSE_MULTIPLE_SYSTEM_PROMPTS.get(lang, _EXPENSE_MULTIPLE_SYSTEM_PROMPTS["en"]), prompt,
+            temperature=0.3, label="multiple expense AI"
         )
         
-        if response.status_code == 200:
-            data = response.json()
-            content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            
+        if content is not None:
             try:
-                # Remove markdown code blocks if present
-                if "```json" in content:
-                    content = content.split("```json")[1].split("```")[0].strip()
-                elif "```" in content:
-                    content = content.split("```")[1].split("```")[0].strip()
-                
-                result = json.loads(content)
+                result = _parse_json_content(content)
                 
                 # Ensure result is a list
                 if not isinstance(result, list):
@@ -472,122 +961,113 @@ Text: {text}"""
                 # Normalize expenses
                 expenses = []
                 for item in result:
-                    amount_value = item.get("amount", 0)
-                    try:
-                        amount = float(amount_value)
-                    except (ValueError, TypeError):
-                        amount = 0.0
-                    
-                    currency_raw = item.get("currency", default_currency).upper().strip()
-                    currency_map = {
-                        "YUAN": "CNY", "RMB": "CNY", "CN¥": "CNY", "¥": "CNY",
-                        "DOLLAR": "USD", "DOLLARS": "USD", "$": "USD", "US$": "USD",
-                        "EURO": "EUR", "EUROS": "EUR", "€": "EUR",
-                        "RUBLE": "RUB", "RUBLES": "RUB", "RUBL": "RUB", "₽": "RUB",
-                        "SOM": "UZS", "SO'M": "UZS", "UZS": "UZS"
-                    }
-                    currency = currency_map.get(currency_raw, currency_raw if len(currency_raw) <= 5 else default_currency)
-                    
                     expenses.append({
-                        "amount": amount,
-                        "currency": currency,
+                        "amount": _coerce_amount(item.get("amount")),
+                        "currency": _normalize_currency(item.get("currency"), default_currency),
                         "category": item.get("category", "Other"),
                         "description": item.get("description", "")
                     })
                 
                 return expenses
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 logger.error(f"JSON decode error in multiple expense AI: {e}")
-                # Fallback: try single expense extraction
-                single = deepseek_ai_expense(text, lang)
-                return [single] if single.get("amount", 0) > 0 else []
+                return _fallback_expenses(text, lang, default_currency)
         else:
-            logger.error(f"DeepSeek API error in multiple expense AI: {response.status_code}")
-            single = deepseek_ai_expense(text, lang)
-            return [single] if single.get("amount", 0) > 0 else []
+            return _fallback_expenses(text, lang, default_currency)
     
     except Exception as e:
         logger.error(f"Error calling DeepSeek API for multiple expenses: {e}")
-        single = deepseek_ai_expense(text, lang)
-        return [single] if single.get("amount", 0) > 0 else []
+        return _fallback_expenses(text, lang, default_currency)
 
 
-def deepseek_ai_country(country_text: str, lang: str = "en") -> Optional[str]:
-    """
-    DeepSeek_AI_Country: Detect country name from any language and return timezone.
-    
-    Args:
-        country_text: Country name in any language (e.g., "Uzbekistan", "Узбекистан", "O'zbekiston")
-        lang: User's language preference (uz, ru, en)
-    
-    Returns:
-        Timezone name string (e.g., "Asia/Tashkent") or None
-    """
-    prompts = {
-        "uz": f"""Quyidagi matndan mamlakat nomini aniqlang va uning vaqt mintaqasini (timezone) qaytaring.
-Mamlakat nomi: {country_text}
+def _fallback_expenses(text: str, lang: str, default_currency: str) -> list:
+    """Single keyword-based expense when the multi-expense call fails; no second API round-trip."""
+    single = _extract_expense_manually(text, lang, default_currency)
+    if single["amount"] <= 0:
+        return []
+    return [{key: single[key] for key in ("amount", "currency", "category", "description")}]
+
+
+_COUNTRY_SYSTEM = "You map a country name in any language (English, Russian, Uzbek, ...) to its IANA timezone name (e.g. 'Asia/Tashkent', 'Europe/Moscow', 'America/New_York'). Return ONLY the timezone name, or 'None' if the country cannot be identified."
+
+_COUNTRY_INSTRUCTIONS = {
+    "uz": """Foydalanuvchi xabaridan mamlakat nomini aniqlang va uning vaqt mintaqasini (timezone) qaytaring.
 
 Siz faqat timezone nomini qaytaring (masalan: "Asia/Tashkent", "Europe/Moscow", "America/New_York").
 Agar mamlakat aniqlanmasa, "None" qaytaring.
 Faqat timezone nomini yoki "None" ni qaytaring, boshqa hech narsa emas.""",
-        "ru": f"""Определите название страны из следующего текста и верните её часовой пояс (timezone).
-Название страны: {country_text}
+    "ru": """Определите название страны из сообщения пользователя и верните её часовой пояс (timezone).
 
 Верните только название timezone (например: "Asia/Tashkent", "Europe/Moscow", "America/New_York").
 Если страна не определена, верните "None".
 Верните только название timezone или "None", ничего больше.""",
-        "en": f"""Identify the country name from the following text and return its timezone.
-Country name: {country_text}
+    "en": """Identify the country name from the user's message and return its timezone.
 
 Return only the timezone name (e.g., "Asia/Tashkent", "Europe/Moscow", "America/New_York").
 If country cannot be identified, return "None".
 Return only the timezone name or "None", nothing else."""
-    }
+}
+
+_COUNTRY_SYSTEM_PROMPTS = {
+    lang: f"{_COUNTRY_SYSTEM}\n\n{instructions}" for lang, instructions in _COUNTRY_INSTRUCTIONS.items()
+}
+
+_COUNTRY_USER_TEMPLATES = {
+    "uz": "Mamlakat nomi: {country_text}",
+    "ru": "Название страны: {country_text}",
+    "en": "Country name: {country_text}"
+}
+
+
+def deepseek_ai_country(country_text: str, lang: str = "en") -> Optional[str]:
+    """
+    DeepSeek_AI_Country: Detect country name from any language and return timezone.
     
-    prompt = prompts.get(lang, prompts["en"])
+    Args:
+        country_text: Country name in any language (e.g., "Uzbekistan", "Узбекистан", "O'zbekiston")
+        lang: User's language preference (uz, ru, en)
+    
+    Returns:
+        Timezone name string (e.g., "Asia/Tashkent") or None
+    """
+    if not _WORD_CHAR_RE.search(country_text or ""):
+        return None
+    
+    # Country -> timezone does not depend on the UI language, so key on the text only
+    cache_key = _WHITESPACE_RE.sub(" ", country_text.strip().casefold())
+    cached = _country_cache.get(cache_key)
+    if cached is _COUNTRY_NOT_FOUND:
+        return None
+    if cached is not None:
+        return cached
+    
+    prompt = _COUNTRY_USER_TEMPLATES.get(lang, _COUNTRY_USER_TEMPLATES["en"]).format(country_text=country_text)
     
     try:
-        headers = {
-            "Authorization": f"Bearer {Config.DEEPSEEK_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": "You are DeepSeek_AI_Country - specialized for country detection and timezone identification from any language. Your ONLY job is to identify the country name from user input (which can be in any language: English, Russian, Uzbek, etc.) and return the corresponding IANA timezone name (e.g., 'Asia/Tashkent', 'Europe/Moscow', 'America/New_York'). Return ONLY the timezone name or 'None' if country cannot be identified. Do not include any explanation or additional text."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.2
-        }
-        
-        response = requests.post(
-            Config.DEEPSEEK_API_URL,
-            headers=headers,
-            json=payload,
-            timeout=15
+        content = _chat(
+            _COUNTRY_SYSTEM_PROMPTS.get(lang, _COUNTRY_SYSTEM_PROMPTS["en"]), prompt,
+            temperature=0.2, label="country AI", timeout=15
         )
         
-        if response.status_code == 200:
-            data = response.json()
-            content = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
-            
+        if content is not None:
             # Clean up response - remove quotes, whitespace, etc.
             content = content.strip().strip('"').strip("'").strip()
             
             if content.lower() == "none" or not content:
                 logger.debug(f"AI could not detect country from: {country_text}")
+                _country_cache.set(cache_key, _COUNTRY_NOT_FOUND, ttl=_COUNTRY_NEGATIVE_TTL)
                 return None
             
-            # Validate timezone format (basic check)
-            if "/" in content and len(content.split("/")) == 2:
+            # Accept only real IANA names (also allows "America/Argentina/Buenos_Aires")
+            if content in _VALID_TIMEZONES:
                 logger.info(f"AI detected timezone {content} from country text: {country_text} (language: {lang})")
+                _country_cache.set(cache_key, content)
                 return content
             else:
-                logger.warning(f"AI returned invalid timezone format: {content} from country text: {country_text}")
+                logger.warning(f"AI returned unknown timezone: {content} from country text: {country_text}")
+                _country_cache.set(cache_key, _COUNTRY_NOT_FOUND, ttl=_COUNTRY_NEGATIVE_TTL)
                 return None
         else:
-            logger.error(f"DeepSeek API error in country AI: {response.status_code}")
             return None
     
     except Exception as e:
@@ -595,119 +1075,87 @@ Return only the timezone name or "None", nothing else."""
         return None
 
 
-def deepseek_ai_income(text: str, lang: str = "en", default_currency: str = "USD") -> Dict:
-    """
-    DeepSeek_AI_Income: Extract income information from natural language.
-    
-    Args:
-        text: User's income description (text or transcribed voice)
-        lang: User's language preference (uz, ru, en)
-        default_currency: Default currency if not specified
-    
-    Returns:
-        Dictionary with amount, currency, description, and income_type (monthly/daily)
-    """
-    prompts = {
-        "uz": f"""Quyidagi matndan daromad ma'lumotlarini ajratib oling va JSON formatida javob bering:
-{{
+_INCOME_SYSTEM = "You extract income (amount, currency, description, income_type monthly/daily) from the user's message. Detect the currency from the text; otherwise use the default currency given at the end of the message. Respond with a single JSON object, no prose."
+
+_INCOME_INSTRUCTIONS = {
+    "uz": """Quyidagi matndan daromad ma'lumotlarini ajratib oling va JSON formatida javob bering:
+{
     "amount": <raqam>,
     "currency": "<valyuta>",
     "description": "<tavsif>",
     "income_type": "<monthly yoki daily>"
-}}
+}
 
 MUHIM: 
 - Valyutani matndan aniqlang (masalan: USD, EUR, CNY, RMB, Yuan, Dollar, Euro, so'm, rubl)
 - income_type: Agar "oylik", "monthly", "har oy" deb aytilgan bo'lsa "monthly", "kunlik", "daily", "har kuni" bo'lsa "daily"
-- Agar valyuta ko'rsatilmagan bo'lsa, "{default_currency}" dan foydalaning
-
-Matn: {text}""",
-        "ru": f"""Извлеките информацию о доходе из следующего текста и верните JSON ответ:
-{{
+- Agar valyuta ko'rsatilmagan bo'lsa, xabar oxirida berilgan standart valyutadan foydalaning""",
+    "ru": """Извлеките информацию о доходе из следующего текста и верните JSON ответ:
+{
     "amount": <число>,
     "currency": "<валюта>",
     "description": "<описание>",
     "income_type": "<monthly или daily>"
-}}
+}
 
 ВАЖНО:
 - Определите валюту из текста (например: USD, EUR, CNY, RMB, Yuan, Dollar, Euro, доллар, юань, рубль)
 - income_type: Если сказано "месячный", "monthly", "каждый месяц" - "monthly", если "дневной", "daily", "каждый день" - "daily"
-- Если валюта не указана, используйте "{default_currency}"
-
-Текст: {text}""",
-        "en": f"""Extract income information from the following text and return a JSON response:
-{{
+- Если валюта не указана, используйте валюту по умолчанию из конца сообщения""",
+    "en": """Extract income information from the following text and return a JSON response:
+{
     "amount": <number>,
     "currency": "<currency>",
     "description": "<description>",
     "income_type": "<monthly or daily>"
-}}
+}
 
 IMPORTANT:
 - Detect the currency from the text (e.g., USD, EUR, CNY, RMB, Yuan, Dollar, Euro, dollars, yuan, etc.)
 - income_type: If mentioned as "monthly", "per month", "each month" - use "monthly", if "daily", "per day", "each day" - use "daily"
-- If no currency is mentioned, use "{default_currency}"
+- If no currency is mentioned, use the default currency given at the end of the message"""
+}
 
-Text: {text}"""
-    }
+_INCOME_SYSTEM_PROMPTS = {
+    lang: f"{_INCOME_SYSTEM}\n\n{instructions}" for lang, instructions in _INCOME_INSTRUCTIONS.items()
+}
+
+
+def deepseek_ai_income(text: str, lang: str = "en", default_currency: str = "USD") -> Dict:
+    """
+    DeepSeek_AI_Income: Extract income information from natural language.
     
-    prompt = prompts.get(lang, prompts["en"])
+    Args:
+        text: User's income description (text or transcribed voice)
+        lang: User's language preference (uz, ru, en)
+        default_currency: Default currency if not specified
+    
+    Returns:
+        Dictionary with amount, currency, description, and income_type (monthly/daily)
+    """
+    if not _WORD_CHAR_RE.search(text or ""):
+        return _extract_income_manually(text or "", lang, default_currency)
+    
+    prompt = _EXTRACTION_USER_TEMPLATES.get(lang, _EXTRACTION_USER_TEMPLATES["en"]).format(text=text, default_currency=default_currency)
     
     try:
-        headers = {
-            "Authorization": f"Bearer {Config.DEEPSEEK_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": f"You are DeepSeek_AI_Income - specialized for income extraction. Extract income information from user messages. Detect amount, currency (from text or use {default_currency}), description, and income_type (monthly or daily based on context). Return ONLY valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.3
-        }
-        
-        response = requests.post(
-            Config.DEEPSEEK_API_URL,
-            headers=headers,
-            json=payload,
-            timeout=30
+        content = _chat(
+            _INCOME_SYSTEM_PROMPTS.get(lang, _INCOME_SYSTEM_PROMPTS["en"]), prompt,
+            temperature=0.3, label="income AI", response_format={"type": "json_object"}
         )
         
-        if response.status_code == 200:
-            data = response.json()
-            content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            
+        if content is not None:
             try:
-                # Remove markdown code blocks if present
-                if "```json" in content:
-                    content = content.split("```json")[1].split("```")[0].strip()
-                elif "```" in content:
-                    content = content.split("```")[1].split("```")[0].strip()
-                
-                result = json.loads(content)
+                result = _parse_json_content(content)
                 
                 # Validate and normalize
-                amount_value = result.get("amount", 0)
-                try:
-                    amount = float(amount_value)
-                except (ValueError, TypeError):
-                    amount = 0.0
-                
-                currency_raw = result.get("currency", default_currency).upper().strip()
-                currency_map = {
-                    "YUAN": "CNY", "RMB": "CNY", "CN¥": "CNY", "¥": "CNY",
-                    "DOLLAR": "USD", "DOLLARS": "USD", "$": "USD", "US$": "USD",
-                    "EURO": "EUR", "EUROS": "EUR", "€": "EUR",
-                    "RUBLE": "RUB", "RUBLES": "RUB", "RUBL": "RUB", "₽": "RUB",
-                    "SOM": "UZS", "SO'M": "UZS", "UZS": "UZS"
-                }
-                currency = currency_map.get(currency_raw, currency_raw if len(currency_raw) <= 5 else default_currency)
+                amount = _coerce_amount(result.get("amount"))
+                currency = _normalize_currency(result.get("currency"), default_currency)
                 
-                income_type_raw = result.get("income_type", "monthly").lower().strip()
-                income_type = "monthly" if "month" in income_type_raw or income_type_raw == "monthly" else "daily"
+                # The model answers "monthly" or "daily"; anything else counts as monthly
+                income_type_raw = result.get("income_type")
+                is_daily = isinstance(income_type_raw, str) and income_type_raw.lstrip()[:1] in ("d", "D")
+                income_type = "daily" if is_daily else "monthly"
                 
                 return {
                     "amount": amount,
@@ -715,11 +1163,10 @@ Text: {text}"""
                     "description": result.get("description", ""),
                     "income_type": income_type
                 }
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 logger.error(f"JSON decode error in income AI: {e}")
                 return _extract_income_manually(text, lang, default_currency)
         else:
-            logger.error(f"DeepSeek API error in income AI: {response.status_code}")
             return _extract_income_manually(text, lang, default_currency)
     
     except Exception as e:
@@ -727,34 +1174,50 @@ Text: {text}"""
         return _extract_income_manually(text, lang, default_currency)
 
 
+def _detect_currency(text_lower: str, default: str = "USD") -> str:
+    """ISO code of the first whole-word currency keyword or symbol in already-lowercased text, else default."""
+    match = _CURRENCY_WORD_RE.search(text_lower)
+    return match.lastgroup if match else default
+
+
+def _detect_category(text_lower: str) -> str:
+    """Category of the first category keyword in already-lowercased text, else 'Other'."""
+    match = _CATEGORY_RE.search(text_lower)
+    return match.lastgroup if match else "Other"
+
+
+def _detect_income_type(text_lower: str) -> str:
+    """'daily' if already-lowercased text mentions a daily rate, else 'monthly'."""
+    return "daily" if _INCOME_DAILY_RE.search(text_lower) else "monthly"
+
+
+@lru_cache(maxsize=4096)
+def _classify_income(text: str, default_currency: str) -> tuple:
+    """(amount, currency, income_type) for text; cached because short messages repeat."""
+    match = _NUM_RE.search(text)
+    text_lower = text.casefold()
+    return (
+        float(match.group()) if match else 0.0,
+        _detect_currency(text_lower, default_currency),
+        _detect_income_type(text_lower)
+    )
+
+
+@lru_cache(maxsize=4096)
+def _classify_expense(text: str, default_currency: str) -> tuple:
+    """(amount, currency, category) for text; cached because short messages repeat."""
+    match = _NUM_RE.search(text)
+    text_lower = text.casefold()
+    return (
+        float(match.group()) if match else 0.0,
+        _detect_currency(text_lower, default_currency),
+        _detect_category(text_lower)
+    )
+
+
 def _extract_income_manually(text: str, lang: str, default_currency: str) -> Dict:
     """Fallback manual extraction if API fails."""
-    import re
-    
-    # Try to extract numbers
-    numbers = re.findall(r'\d+\.?\d*', text)
-    amount = float(numbers[0]) if numbers else 0.0
-    
-    text_lower = text.lower()
-    
-    # Detect income type
-    income_type = "monthly"
-    if any(word in text_lower for word in ["daily", "per day", "each day", "kunlik", "har kuni", "дневной", "каждый день"]):
-        income_type = "daily"
-    
-    # Try to detect currency
-    currency = default_currency
-    if any(word in text_lower for word in ["yuan", "rmb", "cny", "¥"]):
-        currency = "CNY"
-    elif any(word in text_lower for word in ["dollar", "usd", "$"]):
-        currency = "USD"
-    elif any(word in text_lower for word in ["euro", "eur", "€"]):
-        currency = "EUR"
-    elif any(word in text_lower for word in ["ruble", "rub", "₽", "rubl"]):
-        currency = "RUB"
-    elif any(word in text_lower for word in ["som", "so'm", "uzs"]):
-        currency = "UZS"
-    
+    amount, currency, income_type = _classify_income(text, default_currency)
     return {
         "amount": amount,
         "currency": currency,
@@ -763,51 +1226,9 @@ def _extract_income_manually(text: str, lang: str, default_currency: str) -> Dic
     }
 
 
-def _extract_expense_manually(text: str, lang: str) -> Dict:
+def _extract_expense_manually(text: str, lang: str, default_currency: str = "USD") -> ExpenseData:
     """Fallback manual extraction if API fails."""
-    import re
-    
-    # Try to extract numbers
-    numbers = re.findall(r'\d+\.?\d*', text)
-    amount = float(numbers[0]) if numbers else 0.0
-    
-    # Simple keyword-based categorization
-    text_lower = text.lower()
-    category = "Other"
-    
-    food_keywords = ["burger", "food", "restaurant", "eat", "meal", "pizza", "osh", "non", "taom", "еда", "ресторан", "lunch", "dinner", "breakfast"]
-    transport_keywords = ["taxi", "bus", "train", "transport", "taksi", "avtobus", "mashina", "такси", "автобус"]
-    entertainment_keywords = ["cinema", "movie", "game", "entertainment", "kino", "o'yin", "кино", "игра"]
-    education_keywords = ["book", "course", "education", "kitob", "kurs", "ta'lim", "книга", "курс"]
-    health_keywords = ["doctor", "medicine", "hospital", "health", "doktor", "dori", "shifoxona", "доктор", "лекарство"]
-    electronics_keywords = ["phone", "computer", "electronic", "telefon", "kompyuter", "телефон", "компьютер"]
-    
-    if any(kw in text_lower for kw in food_keywords):
-        category = "Food"
-    elif any(kw in text_lower for kw in transport_keywords):
-        category = "Transport"
-    elif any(kw in text_lower for kw in entertainment_keywords):
-        category = "Entertainment"
-    elif any(kw in text_lower for kw in education_keywords):
-        category = "Education"
-    elif any(kw in text_lower for kw in health_keywords):
-        category = "Health"
-    elif any(kw in text_lower for kw in electronics_keywords):
-        category = "Electronics"
-    
-    # Try to detect currency from text
-    currency = "USD"  # Default
-    if any(word in text_lower for word in ["yuan", "rmb", "cny", "¥"]):
-        currency = "CNY"
-    elif any(word in text_lower for word in ["dollar", "usd", "$"]):
-        currency = "USD"
-    elif any(word in text_lower for word in ["euro", "eur", "€"]):
-        currency = "EUR"
-    elif any(word in text_lower for word in ["ruble", "rub", "₽"]):
-        currency = "RUB"
-    elif any(word in text_lower for word in ["som", "so'm", "uzs"]):
-        currency = "UZS"
-    
+    amount, currency, category = _classify_expense(text, default_currency)
     return {
         "amount": amount,
         "currency": currency,
@@ -815,4 +1236,3 @@ def _extract_expense_manually(text: str, lang: str) -> Dict:
         "description": text,
         "advice": ""
     }
-
@@ -8,6 +8,7 @@ from telebot import types
 import signal
 import sys
 import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
 from telebot import apihelper
 from config import Config
 from database import Database
@@ -15,11 +16,13 @@ from scheduler import ReminderScheduler
 from handlers.expense_handler import ExpenseHandler
 from handlers.income_handler import IncomeHandler
 from handlers.report_handler import ReportHandler
-from handlers.reminder_handler import ReminderHandler
+from handlers.reminder_handler import ReminderHandler, get_timezone_from_country, get_timezone_from_location
 from handlers.settings_handler import SettingsHandler
 from handlers.about_handler import AboutHandler
 from keyboards import create_main_keyboard, create_language_keyboard, create_currency_keyboard, create_report_keyboard, create_back_keyboard
 from translations import get_translation, get_language_name
+from ai_functions import close_session
+from webhook import create_webhook_server
 
 # Configure logging first
 logging.basicConfig(
@@ -31,7 +34,7 @@ logger = logging.getLogger(__name__)
 # Configure proxy if provided (optional)
 if Config.PROXY_URL:
     apihelper.proxy = {'https': Config.PROXY_URL}
-    logger.info(f"Using proxy: {Config.PROXY_URL}")
+    logger.info("Using proxy: %s", Config.PROXY_URL)
 else:
     # No proxy configured - use direct connection
     apihelper.proxy = None
@@ -41,11 +44,12 @@ else:
 try:
     Config.validate()
 except ValueError as e:
-    logger.error(f"Configuration error: {e}")
+    logger.error("Configuration error: %s", e)
     sys.exit(1)
 
-# Initialize bot
-bot = telebot.TeleBot(Config.BOT_TOKEN)
+# Initialize bot; handlers block on AI/voice/geocoding calls, so run them on a
+# wider worker pool than telebot's default of 2 to avoid head-of-line blocking
+bot = telebot.TeleBot(Config.BOT_TOKEN, num_threads=Config.BOT_NUM_THREADS)
 
 # Initialize database
 db = Database()
@@ -68,6 +72,41 @@ reminder_handler.scheduler = scheduler
 user_states = {}
 
 
+def set_state(user_id: int, state: str):
+    """Record the user's input mode, writing only on change; "none" is the default and is not stored."""
+    if state == "none":
+        user_states.pop(user_id, None)
+    elif user_states.get(user_id) != state:
+        user_states[user_id] = state
+
+
+def exit_all_modes(user_id: int):
+    """Leave expense/income/report/reminder input mode and reset the user's state."""
+    expense_handler.active_expense_mode.discard(user_id)
+    income_handler.active_income_mode.discard(user_id)
+    report_handler.active_report_mode.discard(user_id)
+    reminder_handler.active_reminder_mode.discard(user_id)
+    set_state(user_id, "none")
+
+
+def _chat_id(call: telebot.types.CallbackQuery) -> int:
+    """Chat to answer a callback in; falls back to the user when the message is gone."""
+    return call.message.chat.id if call.message else call.from_user.id
+
+
+# Reply-keyboard labels in every supported language, built once
+LANGUAGES = ("en", "ru", "uz")
+BACK_TEXTS = frozenset(get_translation(lang, "back") for lang in LANGUAGES)
+SKIP_TEXTS = frozenset(get_translation(lang, "skip") for lang in LANGUAGES)
+ENTER_COUNTRY_TEXTS = frozenset(get_translation(lang, "enter_country") for lang in LANGUAGES)
+# One lookup decides which special-button branch a text message takes
+SPECIAL_TEXTS = {
+    **{text: "back" for text in BACK_TEXTS},
+    **{text: "skip" for text in SKIP_TEXTS},
+    **{text: "enter_country" for text in ENTER_COUNTRY_TEXTS},
+}
+
+
 # Start command
 @bot.message_handler(commands=['start'])
 def start_command(message: telebot.types.Message):
@@ -107,18 +146,18 @@ def start_command(message: telebot.types.Message):
 
 
 # Language selection callback
-@bot.callback_query_handler(func=lambda call: call.data.startswith("lang_"))
 def language_callback(call: telebot.types.CallbackQuery):
     """Handle language selection."""
     language_code = call.data.split("_")[1]
     db.update_user_language(call.from_user.id, language_code)
-    user_states[call.from_user.id] = "none"
+    set_state(call.from_user.id, "none")
     
     # Get updated user
     user = db.get_or_create_user(call.from_user.id, call.from_user.first_name or "User")
     language = user.language or "en"
     
     bot.answer_callback_query(call.id)
+    chat_id = _chat_id(call)
     
     # Request location/country if timezone is not set
     if not user.timezone or user.timezone == 'UTC':
@@ -128,7 +167,7 @@ def language_callback(call: telebot.types.CallbackQuery):
         keyboard.add(types.KeyboardButton(get_translation(language, "skip")))
         
         bot.send_message(
-            call.message.chat.id,
+            chat_id,
             get_translation(language, "request_location_for_timezone"),
             reply_markup=keyboard
         )
@@ -136,163 +175,148 @@ def language_callback(call: telebot.types.CallbackQuery):
     
     # Timezone is set - show main menu
     bot.send_message(
-        call.message.chat.id,
+        chat_id,
         get_translation(language_code, "language_set"),
         reply_markup=create_main_keyboard(language_code)
     )
 
 
-# Main menu button handlers
-@bot.message_handler(func=lambda message: message.text and (
-    get_translation("en", "expenses") in message.text or
-    get_translation("ru", "expenses") in message.text or
-    get_translation("uz", "expenses") in message.text
-))
+# Main menu button handlers (routed through BUTTON_DISPATCH below)
 def expenses_button(message: telebot.types.Message):
     """Handle expenses button."""
     expense_handler.handle_expense_command(message)
-    user_states[message.from_user.id] = "expense"
+    set_state(message.from_user.id, "expense")
 
 
-@bot.message_handler(func=lambda message: message.text and (
-    get_translation("en", "income") in message.text or
-    get_translation("ru", "income") in message.text or
-    get_translation("uz", "income") in message.text
-))
 def income_button(message: telebot.types.Message):
     """Handle income button."""
     income_handler.handle_income_command(message)
-    user_states[message.from_user.id] = "income"
+    set_state(message.from_user.id, "income")
 
 
-@bot.message_handler(func=lambda message: message.text and (
-    get_translation("en", "reports") in message.text or
-    get_translation("ru", "reports") in message.text or
-    get_translation("uz", "reports") in message.text
-))
 def reports_button(message: telebot.types.Message):
     """Handle reports button."""
     report_handler.handle_report_command(message)
     # Report mode removed - now uses buttons only
 
 
-@bot.message_handler(func=lambda message: message.text and (
-    get_translation("en", "reminders") in message.text or
-    get_translation("ru", "reminders") in message.text or
-    get_translation("uz", "reminders") in message.text
-))
 def reminders_button(message: telebot.types.Message):
     """Handle reminders button."""
     reminder_handler.handle_reminder_command(message)
-    user_states[message.from_user.id] = "reminder"
+    set_state(message.from_user.id, "reminder")
 
 
-@bot.message_handler(func=lambda message: message.text and (
-    get_translation("en", "settings") in message.text or
-    get_translation("ru", "settings") in message.text or
-    get_translation("uz", "settings") in message.text
-))
 def settings_button(message: telebot.types.Message):
     """Handle settings button."""
-    # Exit any active modes
-    expense_handler.active_expense_mode.discard(message.from_user.id)
-    income_handler.active_income_mode.discard(message.from_user.id)
-    report_handler.active_report_mode.discard(message.from_user.id)
-    reminder_handler.active_reminder_mode.discard(message.from_user.id)
-    user_states[message.from_user.id] = "none"
+    exit_all_modes(message.from_user.id)
     settings_handler.handle_settings_command(message)
 
 
-@bot.message_handler(func=lambda message: message.text and (
-    get_translation("en", "about") in message.text or
-    get_translation("ru", "about") in message.text or
-    get_translation("uz", "about") in message.text
-))
 def about_button(message: telebot.types.Message):
     """Handle about button."""
-    # Exit any active modes
-    expense_handler.active_expense_mode.discard(message.from_user.id)
-    income_handler.active_income_mode.discard(message.from_user.id)
-    report_handler.active_report_mode.discard(message.from_user.id)
-    reminder_handler.active_reminder_mode.discard(message.from_user.id)
-    user_states[message.from_user.id] = "none"
+    exit_all_modes(message.from_user.id)
     about_handler.handle_about_command(message)
 
 
+# Exact main-menu label in every language -> handler; one dict probe per text message
+BUTTON_DISPATCH = {
+    get_translation(lang, key): handler
+    for key, handler in (
+        ("expenses", expenses_button),
+        ("income", income_button),
+        ("reports", reports_button),
+        ("reminders", reminders_button),
+        ("settings", settings_button),
+        ("about", about_button),
+    )
+    for lang in LANGUAGES
+}
+
+
+@bot.message_handler(func=lambda message: message.text in BUTTON_DISPATCH)
+def main_menu_button(message: telebot.types.Message):
+    """Route a main-menu button press to its handler."""
+    BUTTON_DISPATCH[message.text](message)
+
+
 # Expense confirmation callbacks
-@bot.callback_query_handler(func=lambda call: call.data == "confirm_yes" and call.from_user.id in expense_handler.pending_expenses)
 def confirm_expense(call: telebot.types.CallbackQuery):
     """Handle expense confirmation (yes)."""
     expense_handler.handle_expense_confirmation(call, confirmed=True)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "confirm_no" and call.from_user.id in expense_handler.pending_expenses)
 def reject_expense(call: telebot.types.CallbackQuery):
     """Handle expense rejection (no)."""
     expense_handler.handle_expense_confirmation(call, confirmed=False)
 
 
 # Income confirmation callbacks
-@bot.callback_query_handler(func=lambda call: call.data in ["confirm_yes", "confirm_no"] and call.from_user.id in income_handler.pending_incomes)
 def income_confirm_callback(call: telebot.types.CallbackQuery):
     """Handle income confirmation callback."""
     income_handler.handle_income_confirm(call)
 
 
+def confirm_callback(call: telebot.types.CallbackQuery):
+    """Route confirm_yes/confirm_no to whichever flow is waiting on this user."""
+    user_id = call.from_user.id
+    if user_id in expense_handler.pending_expenses:
+        if call.data == "confirm_yes":
+            confirm_expense(call)
+        else:
+            reject_expense(call)
+    elif user_id in income_handler.pending_incomes:
+        income_confirm_callback(call)
+    elif user_id in settings_handler.deleting_account:
+        delete_account_confirm_callback(call)
+
+
 # Settings callbacks
-@bot.callback_query_handler(func=lambda call: call.data == "settings_lang")
 def settings_lang_callback(call: telebot.types.CallbackQuery):
     """Handle language change from settings."""
     settings_handler.handle_language_change(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "settings_profile")
 def settings_profile_callback(call: telebot.types.CallbackQuery):
     """Handle profile edit from settings."""
     settings_handler.handle_profile_edit(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "settings_timezone")
 def settings_timezone_callback(call: telebot.types.CallbackQuery):
     """Handle timezone change from settings."""
     settings_handler.handle_timezone_change(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "settings_currency")
 def settings_currency_callback(call: telebot.types.CallbackQuery):
     """Handle currency change from settings."""
     settings_handler.handle_currency_change(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "settings_delete_account")
 def settings_delete_account_callback(call: telebot.types.CallbackQuery):
     """Handle delete account from settings."""
     settings_handler.handle_delete_account(call)
 
 
-@bot.callback_query_handler(func=lambda call: call.data in ["confirm_yes", "confirm_no"] and call.from_user.id in settings_handler.deleting_account)
 def delete_account_confirm_callback(call: telebot.types.CallbackQuery):
     """Handle account deletion confirmation."""
     settings_handler.handle_delete_account_confirm(call, scheduler=scheduler)
 
 
 # About callbacks
-@bot.callback_query_handler(func=lambda call: call.data == "about_donate")
 def about_donate_callback(call: telebot.types.CallbackQuery):
     """Handle donate from about page."""
     about_handler.handle_donate_callback(call)
 
 
 # Donation callbacks
-@bot.callback_query_handler(func=lambda call: call.data.startswith("donate_"))
 def donate_callback(call: telebot.types.CallbackQuery):
     """Handle donation amount selection."""
+    chat_id = _chat_id(call)
     if call.data == "donate_back":
         bot.answer_callback_query(call.id)
         user = db.get_or_create_user(call.from_user.id, call.from_user.first_name or "User")
         language = user.language or "en"
         bot.send_message(
-            call.message.chat.id,
+            chat_id,
             get_translation(language, "main_menu"),
             reply_markup=create_main_keyboard(language)
         )
@@ -303,7 +327,7 @@ def donate_callback(call: telebot.types.CallbackQuery):
         user = db.get_or_create_user(call.from_user.id, call.from_user.first_name or "User")
         language = user.language or "en"
         bot.send_message(
-            call.message.chat.id,
+            chat_id,
             get_translation(language, "donate_custom")
         )
         about_handler.waiting_for_custom_donation.add(call.from_user.id)
@@ -311,7 +335,7 @@ def donate_callback(call: telebot.types.CallbackQuery):
     
     try:
         amount = int(call.data.split("_")[1])
-        about_handler.send_donation_invoice(call.message.chat.id, amount)
+        about_handler.send_donation_invoice(chat_id, amount)
         bot.answer_callback_query(call.id)
     except (ValueError, IndexError):
         bot.answer_callback_query(call.id, "Invalid amount")
@@ -356,23 +380,20 @@ def process_successful_payment(message: telebot.types.Message):
         # Fallback to English if user lookup fails
         language = "en"
     
-    payload = message.successful_payment.invoice_payload
     stars = message.successful_payment.total_amount
+    # Record the donation before the thank-you send, which can fail on its own
+    logger.info("Received donation: %s ⭐ from user %s (language: %s)", stars, message.from_user.id, language)
     
     thanks_message = get_translation(language, "donate_thanks", amount=stars)
     bot.send_message(message.chat.id, thanks_message)
-    
-    logger.info(f"Received donation: {stars} ⭐ from user {message.from_user.id} (language: {language})")
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "about_feedback")
 def about_feedback_callback(call: telebot.types.CallbackQuery):
     """Handle feedback from about page."""
     about_handler.handle_feedback_callback(call)
 
 
 # Currency selection callback
-@bot.callback_query_handler(func=lambda call: call.data.startswith("currency_"))
 def currency_callback(call: telebot.types.CallbackQuery):
     """Handle currency selection."""
     currency_code = call.data.split("_")[1]
@@ -392,7 +413,7 @@ def currency_callback(call: telebot.types.CallbackQuery):
             message_id=call.message.message_id
         )
     
-    chat_id = call.message.chat.id if call.message else call.from_user.id
+    chat_id = _chat_id(call)
     
     if state == "expense":
         expense_handler.active_expense_mode.add(call.from_user.id)
@@ -417,71 +438,110 @@ def currency_callback(call: telebot.types.CallbackQuery):
 
 
 # Report period selection callbacks
-@bot.callback_query_handler(func=lambda call: call.data.startswith("report_"))
 def report_period_callback(call: telebot.types.CallbackQuery):
     """Handle report period selection."""
-    from datetime import datetime, timedelta
-    
     user = db.get_or_create_user(call.from_user.id, call.from_user.first_name or "User")
     language = user.language or "en"
     
     bot.answer_callback_query(call.id)
+    chat_id = _chat_id(call)
     
     period = call.data.split("_")[1]  # today, week, month, custom
-    from datetime import timezone as dt_timezone
     now = datetime.now(dt_timezone.utc).replace(tzinfo=None)  # Convert to naive UTC for comparison
     start_date = None
     end_date = now
     
     if period == "today":
-        start_date = datetime(now.year, now.month, now.day)
+        start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
     elif period == "week":
         start_date = now - timedelta(days=7)
     elif period == "month":
-        start_date = datetime(now.year, now.month, 1)
+        start_date = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
     elif period == "custom":
         # For custom, we'll ask user to input dates (simplified - can be enhanced)
         bot.edit_message_text(
             "Custom date selection coming soon. Please use Today/Week/Month for now.",
-            chat_id=call.message.chat.id,
+            chat_id=chat_id,
             message_id=call.message.message_id
         )
         bot.send_message(
-            call.message.chat.id,
+            chat_id,
             get_translation(language, "main_menu"),
             reply_markup=create_main_keyboard(language)
         )
         return
     
-    # Show processing
-    processing_msg = bot.send_message(call.message.chat.id, get_translation(language, "processing"))
+    # Show processing in the period prompt itself; editing it also drops the period buttons
+    if call.message:
+        report_message_id = call.message.message_id
+        bot.edit_message_text(get_translation(language, "processing"), chat_id=chat_id, message_id=report_message_id)
+    else:
+        report_message_id = bot.send_message(chat_id, get_translation(language, "processing")).message_id
     
     try:
+        def show_partial(partial):
+            # Partial report while DeepSeek is still writing; the final text replaces it below
+            if partial:
+                bot.edit_message_text(partial, chat_id=chat_id, message_id=report_message_id)
+        
         # Generate report
-        report = report_handler.generate_report(call.from_user.id, start_date=start_date, end_date=end_date, language=language)
+        report = report_handler.generate_report(
+            call.from_user.id, start_date=start_date, end_date=end_date, language=language, on_progress=show_partial
+        )
         
         # Edit message with report
         bot.edit_message_text(
             report,
-            chat_id=call.message.chat.id,
-            message_id=processing_msg.message_id
+            chat_id=chat_id,
+            message_id=report_message_id
         )
         
         # Auto-return to main menu
         bot.send_message(
-            call.message.chat.id,
+            chat_id,
             get_translation(language, "main_menu"),
             reply_markup=create_main_keyboard(language)
         )
     except Exception as e:
-        logger.error(f"Error generating report: {e}")
+        logger.error("Error generating report: %s", e)
         bot.edit_message_text(
             get_translation(language, "error"),
-            chat_id=call.message.chat.id,
-            message_id=processing_msg.message_id
+            chat_id=chat_id,
+            message_id=report_message_id
         )
 
 
+# Callback data -> handler; matched exactly first, then by the prefix before "_"
+CALLBACK_EXACT = {
+    "confirm_yes": confirm_callback,
+    "confirm_no": confirm_callback,
+    "settings_lang": settings_lang_callback,
+    "settings_profile": settings_profile_callback,
+    "settings_timezone": settings_timezone_callback,
+    "settings_currency": settings_currency_callback,
+    "settings_delete_account": settings_delete_account_callback,
+    "about_donate": about_donate_callback,
+    "about_feedback": about_feedback_callback,
+}
+CALLBACK_PREFIX = {
+    "lang": language_callback,
+    "donate": donate_callback,
+    "currency": currency_callback,
+    "report": report_period_callback,
+}
+
+
+@bot.callback_query_handler(func=lambda call: True)
+def callback_router(call: telebot.types.CallbackQuery):
+    """Single entry point for inline-button callbacks: one dict lookup instead of a predicate per handler."""
+    data = call.data or ""
+    handler = CALLBACK_EXACT.get(data)
+    if handler is None and "_" in data:
+        handler = CALLBACK_PREFIX.get(data.split("_", 1)[0])
+    if handler is not None:
+        handler(call)
+
+
 # Text message handlers
 @bot.message_handler(content_types=['text'])
 def text_message_handler(message: telebot.types.Message):
@@ -497,21 +557,13 @@ def text_message_handler(message: telebot.types.Message):
     
     user = db.get_or_create_user(message.from_user.id, message.from_user.first_name or "User")
     language = user.language or "en"
+    user_id = message.from_user.id
+    action = SPECIAL_TEXTS.get(message.text)
     
     # Check if user clicked "back" button
-    back_texts = [
-        get_translation("en", "back"),
-        get_translation("ru", "back"),
-        get_translation("uz", "back")
-    ]
-    if message.text in back_texts:
-        # Exit all modes
-        expense_handler.active_expense_mode.discard(message.from_user.id)
-        income_handler.active_income_mode.discard(message.from_user.id)
-        report_handler.active_report_mode.discard(message.from_user.id)
-        reminder_handler.active_reminder_mode.discard(message.from_user.id)
+    if action == "back":
+        exit_all_modes(message.from_user.id)
         settings_handler.changing_timezone.discard(message.from_user.id)
-        user_states[message.from_user.id] = "none"
         bot.reply_to(
             message,
             get_translation(language, "main_menu"),
@@ -520,23 +572,16 @@ def text_message_handler(message: telebot.types.Message):
         return
     
     # Check if waiting for feedback
-    if about_handler.handle_feedback_message(message):
+    if user_id in about_handler.waiting_for_feedback and about_handler.handle_feedback_message(message):
         return
     
     # Check if waiting for name update
-    if settings_handler.handle_name_update(message):
+    if user_id in settings_handler.editing_name and settings_handler.handle_name_update(message):
         return
     
     # Check if user clicked "skip" for timezone
-    skip_texts = [
-        get_translation("en", "skip"),
-        get_translation("ru", "skip"),
-        get_translation("uz", "skip")
-    ]
-    if message.text in skip_texts:
+    if action == "skip":
         # User skipped timezone - show main menu
-        user = db.get_or_create_user(message.from_user.id, message.from_user.first_name or "User")
-        language = user.language or "en"
         bot.reply_to(
             message,
             get_translation(language, "main_menu"),
@@ -545,17 +590,9 @@ def text_message_handler(message: telebot.types.Message):
         return
     
     # Check if user is entering country name (check if timezone is not set and not in any mode)
-    user = db.get_or_create_user(message.from_user.id, message.from_user.first_name or "User")
-    language = user.language or "en"
-    
     if (not user.timezone or user.timezone == 'UTC') and user_states.get(message.from_user.id, "none") == "none":
         # Check if it's not a command or button
-        enter_country_texts = [
-            get_translation("en", "enter_country"),
-            get_translation("ru", "enter_country"),
-            get_translation("uz", "enter_country")
-        ]
-        if message.text in enter_country_texts:
+        if action == "enter_country":
             # User clicked "Enter Country" button - just acknowledge
             bot.reply_to(
                 message,
@@ -563,46 +600,38 @@ def text_message_handler(message: telebot.types.Message):
             )
             return
         
-        if message.text not in back_texts:
-            # Try to detect timezone from country name (with language support via AI)
-            from handlers.reminder_handler import get_timezone_from_country
-            tz_name = get_timezone_from_country(message.text, language=language)
-            if tz_name:
-                try:
-                    db.update_user_timezone(message.from_user.id, tz_name)
-                    logger.info(f"Updated timezone for user {message.from_user.id} to {tz_name} from country input: {message.text}")
-                    # Reschedule daily expense reminder for new timezone
-                    scheduler.reschedule_user_daily_reminder(message.from_user.id, tz_name, language)
-                    bot.reply_to(
-                        message,
-                        get_translation(language, "timezone_updated", timezone=tz_name),
-                        reply_markup=create_main_keyboard(language)
-                    )
-                    return
-                except Exception as e:
-                    logger.error(f"Error updating timezone from country: {e}")
-            else:
+        # Try to detect timezone from country name (with language support via AI)
+        tz_name = get_timezone_from_country(message.text, language=language)
+        if tz_name:
+            try:
+                db.update_user_timezone(message.from_user.id, tz_name)
+                logger.info("Updated timezone for user %s to %s from country input: %s", message.from_user.id, tz_name, message.text)
+                # Reschedule daily expense reminder for new timezone
+                scheduler.reschedule_user_daily_reminder(message.from_user.id, tz_name, language)
                 bot.reply_to(
                     message,
-                    get_translation(language, "timezone_detection_failed") + "\n" + get_translation(language, "request_location_for_timezone")
+                    get_translation(language, "timezone_updated", timezone=tz_name),
+                    reply_markup=create_main_keyboard(language)
                 )
                 return
+            except Exception as e:
+                logger.error("Error updating timezone from country: %s", e)
+        else:
+            bot.reply_to(
+                message,
+                get_translation(language, "timezone_detection_failed") + "\n" + get_translation(language, "request_location_for_timezone")
+            )
+            return
     
     # Check if user is changing timezone from settings
     if message.from_user.id in settings_handler.changing_timezone:
-        enter_country_texts = [
-            get_translation("en", "enter_country"),
-            get_translation("ru", "enter_country"),
-            get_translation("uz", "enter_country")
-        ]
-        if message.text in enter_country_texts:
+        if action == "enter_country":
             bot.reply_to(
                 message,
                 get_translation(language, "enter_country_prompt")
             )
             return
         
-        from handlers.reminder_handler import get_timezone_from_country
         tz_name = get_timezone_from_country(message.text, language=language)
         if tz_name:
             try:
@@ -616,7 +645,7 @@ def text_message_handler(message: telebot.types.Message):
                 )
                 return
             except Exception as e:
-                logger.error(f"Error updating timezone from settings country input: {e}")
+                logger.error("Error updating timezone from settings country input: %s", e)
         bot.reply_to(
             message,
             get_translation(language, "timezone_detection_failed") + "\n" + get_translation(language, "enter_country_prompt")
@@ -630,7 +659,7 @@ def text_message_handler(message: telebot.types.Message):
         return
     
     # Check if waiting for custom donation amount
-    if about_handler.handle_custom_donation_input(message):
+    if user_id in about_handler.waiting_for_custom_donation and about_handler.handle_custom_donation_input(message):
         return
     
     # Check user state and route accordingly
@@ -674,13 +703,12 @@ def location_message_handler(message: telebot.types.Message):
     language = user.language or "en"
     
     # Update timezone from location
-    from handlers.reminder_handler import get_timezone_from_location
     tz_name = get_timezone_from_location(message.location.latitude, message.location.longitude)
     
     if tz_name:
         try:
             db.update_user_timezone(message.from_user.id, tz_name)
-            logger.info(f"Updated timezone for user {user.telegram_id} to {tz_name} from location")
+            logger.info("Updated timezone for user %s to %s from location", user.telegram_id, tz_name)
             # Reschedule daily expense reminder for new timezone
             scheduler.reschedule_user_daily_reminder(message.from_user.id, tz_name, language)
             
@@ -700,7 +728,7 @@ def location_message_handler(message: telebot.types.Message):
                     reply_markup=create_main_keyboard(language)
                 )
         except Exception as e:
-            logger.error(f"Error updating timezone from location: {e}")
+            logger.error("Error updating timezone from location: %s", e)
             bot.reply_to(message, get_translation(language, "error"))
     else:
         bot.reply_to(message, get_translation(language, "timezone_detection_failed"))
@@ -720,11 +748,24 @@ def default_handler(message: telebot.types.Message):
     )
 
 
+# Webhook mode
+def run_webhook():
+    """Register the webhook with Telegram and serve updates until shutdown."""
+    bot.remove_webhook()
+    bot.set_webhook(url=Config.WEBHOOK_URL, secret_token=Config.WEBHOOK_SECRET)
+    server = create_webhook_server(
+        bot, Config.WEBHOOK_URL, Config.WEBHOOK_SECRET, Config.WEBHOOK_LISTEN, Config.WEBHOOK_PORT
+    )
+    logger.info("Listening for webhook updates on %s:%s", Config.WEBHOOK_LISTEN, Config.WEBHOOK_PORT)
+    server.serve_forever()
+
+
 # Graceful shutdown
 def signal_handler(sig, frame):
     """Handle shutdown signals."""
     logger.info("\nShutting down bot...")
     scheduler.shutdown()
+    close_session()
     db.close()
     sys.exit(0)
 
@@ -736,7 +777,13 @@ signal.signal(signal.SIGTERM, signal_handler)
 if __name__ == "__main__":
     logger.info("SmartExpenseBot is starting...")
     try:
-        bot.infinity_polling(timeout=10, long_polling_timeout=5)
+        if Config.WEBHOOK_URL:
+            run_webhook()
+        else:
+            # Polling needs the webhook cleared; a no-op if none was set
+            bot.remove_webhook()
+            # Longer long-poll: idle bots make one getUpdates request per 20s instead of per 5s
+            bot.infinity_polling(timeout=20, long_polling_timeout=20)
     except KeyboardInterrupt:
         signal_handler(None, None)
 
@@ -16,10 +16,21 @@ class Config:
     # Telegram Bot
     BOT_TOKEN = os.getenv("BOT_TOKEN", "")
     DEVELOPER_ID = int(os.getenv("DEVELOPER_ID", "0"))
+    # Worker threads running update handlers; AI, voice and geocoding handlers block one for seconds
+    BOT_NUM_THREADS = int(os.getenv("BOT_NUM_THREADS", "16"))
+    
+    # Webhook mode (optional): set WEBHOOK_URL to receive updates by webhook instead of long polling.
+    # The built-in server speaks plain HTTP; terminate TLS in a reverse proxy in front of it
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+    WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
     
     # DeepSeek API
     DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "")
     DEEPSEEK_API_URL = os.getenv("DEEPSEEK_API_URL", "https://api.deepseek.com/v1/chat/completions")
+    DEEPSEEK_POOL_SIZE = int(os.getenv("DEEPSEEK_POOL_SIZE", "32"))
+    DEEPSEEK_CONNECT_TIMEOUT = float(os.getenv("DEEPSEEK_CONNECT_TIMEOUT", "5"))
     
     # Database
     DB_TYPE = os.getenv("DB_TYPE", "sqlite").lower()
@@ -47,5 +58,8 @@ class Config:
             raise ValueError("BOT_TOKEN is required in .env file")
         if not cls.DEEPSEEK_API_KEY:
             raise ValueError("DEEPSEEK_API_KEY is required in .env file")
+        if cls.WEBHOOK_URL and not cls.WEBHOOK_SECRET:
+            # Without it anyone who can reach the listener could post updates as any user
+            raise ValueError("WEBHOOK_SECRET is required in .env file when WEBHOOK_URL is set")
         return True
 
@@ -3,12 +3,14 @@ Database models and utilities using SQLAlchemy.
 Supports both SQLite3 (development) and PostgreSQL (production).
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Text, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session, relationship
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime
+from typing import NamedTuple, Optional
 from config import Config
+from cache import LRUCache
 import threading
 
 Base = declarative_base()
@@ -31,6 +33,21 @@ class User(Base):
     incomes = relationship("Income", back_populates="user", cascade="all, delete-orphan")
 
 
+class UserSnapshot(NamedTuple):
+    """Immutable copy of a User row's columns, safe to share between threads."""
+    id: int
+    telegram_id: int
+    name: str
+    language: Optional[str]
+    timezone: Optional[str]
+    currency: Optional[str]
+    created_at: Optional[datetime]
+    
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(user.id, user.telegram_id, user.name, user.language, user.timezone, user.currency, user.created_at)
+
+
 class Expense(Base):
     """Expense model."""
     __tablename__ = 'expenses'
@@ -101,14 +118,44 @@ class Database:
         # This creates a session per thread, preventing conflicts between concurrent users
         session_factory = sessionmaker(bind=self.engine)
         self.Session = scoped_session(session_factory)
+        # UserSnapshots keyed on telegram_id; every handler fetches the user per
+        # update, so this skips a SELECT per message. Writes below invalidate the
+        # entry and bump its generation, so a read that raced a write is not cached
+        self._user_cache = LRUCache(maxsize=10000, ttl=300)
+        self._user_generations = {}  # {telegram_id: write count}
+        self._user_cache_lock = threading.Lock()
+        # telegram_ids known to have a row; profile updates leave these alone, only
+        # delete_user drops them, so user_exists rarely needs the database
+        self._live_users = LRUCache(maxsize=10000, ttl=300)
     
     @property
     def session(self):
         """Get thread-local session."""
         return self.Session()
     
-    def get_or_create_user(self, telegram_id: int, name: str) -> User:
-        """Get existing user or create new one. Thread-safe."""
+    def _invalidate_user(self, telegram_id: int):
+        """Drop the cached user and bump its generation after a write."""
+        with self._user_cache_lock:
+            self._user_generations[telegram_id] = self._user_generations.get(telegram_id, 0) + 1
+            self._user_cache.pop(telegram_id)
+    
+    def _cache_user(self, telegram_id: int, snapshot: UserSnapshot, generation: int):
+        """Cache snapshot unless the user was written since it was read at generation."""
+        with self._user_cache_lock:
+            if self._user_generations.get(telegram_id, 0) == generation:
+                self._user_cache.set(telegram_id, snapshot)
+    
+    def get_or_create_user(self, telegram_id: int, name: str) -> UserSnapshot:
+        """
+        Get existing user or create new one, as an immutable UserSnapshot.
+        Thread-safe; served from the user cache when possible.
+        """
+        cached = self._user_cache.get(telegram_id)
+        if cached is not None:
+            return cached
+        
+        # Read before the SELECT: a write committed after this point changes it
+        generation = self._user_generations.get(telegram_id, 0)
         session = self.session
         try:
             # Use no_autoflush to prevent premature flushes during query
@@ -127,7 +174,10 @@ class Database:
                     user = session.query(User).filter_by(telegram_id=telegram_id).first()
                     if not user:
                         raise  # Re-raise if still not found after rollback
-            return user
+            snapshot = UserSnapshot.from_user(user)
+            self._cache_user(telegram_id, snapshot, generation)
+            self._live_users.set(telegram_id, True)
+            return snapshot
         finally:
             # Close the session to return it to the pool
             session.close()
@@ -140,6 +190,7 @@ class Database:
             if user:
                 user.language = language
                 session.commit()
+            self._invalidate_user(telegram_id)
         except Exception:
             session.rollback()
             raise
@@ -154,6 +205,7 @@ class Database:
             if user:
                 user.name = name
                 session.commit()
+            self._invalidate_user(telegram_id)
         except Exception:
             session.rollback()
             raise
@@ -168,6 +220,7 @@ class Database:
             if user:
                 user.timezone = timezone
                 session.commit()
+            self._invalidate_user(telegram_id)
         except Exception:
             session.rollback()
             raise
@@ -182,6 +235,7 @@ class Database:
             if user:
                 user.currency = currency
                 session.commit()
+            self._invalidate_user(telegram_id)
         except Exception:
             session.rollback()
             raise
@@ -254,6 +308,40 @@ class Database:
         finally:
             session.close()
     
+    def get_financial_summary(self, telegram_id: int, start_date=None, end_date=None) -> dict:
+        """Get expense/income counts and totals (expenses per category) aggregated in SQL. Thread-safe."""
+        summary = {"expense_count": 0, "expense_total": 0.0, "by_category": {}, "income_count": 0, "income_total": 0.0}
+        session = self.session
+        try:
+            user = session.query(User).filter_by(telegram_id=telegram_id).first()
+            if not user:
+                return summary
+            
+            expense_query = session.query(
+                Expense.category, func.count(Expense.id), func.sum(Expense.amount)
+            ).filter(Expense.user_id == user.id)
+            income_query = session.query(
+                func.count(Income.id), func.coalesce(func.sum(Income.amount), 0.0)
+            ).filter(Income.user_id == user.id)
+            
+            if start_date:
+                expense_query = expense_query.filter(Expense.date >= start_date)
+                income_query = income_query.filter(Income.date >= start_date)
+            if end_date:
+                expense_query = expense_query.filter(Expense.date <= end_date)
+                income_query = income_query.filter(Income.date <= end_date)
+            
+            for category, count, total in expense_query.group_by(Expense.category).all():
+                # NULL and "Other" rows both land under "Other"
+                key = category or "Other"
+                summary["by_category"][key] = summary["by_category"].get(key, 0.0) + (total or 0.0)
+                summary["expense_count"] += count
+                summary["expense_total"] += total or 0.0
+            summary["income_count"], summary["income_total"] = income_query.one()
+            return summary
+        finally:
+            session.close()
+    
     def add_reminder(self, telegram_id: int, message: str, reminder_time: datetime):
         """Add a reminder for a user. Thread-safe."""
         session = self.session
@@ -400,11 +488,17 @@ class Database:
             session.close()
     
     def user_exists(self, telegram_id: int) -> bool:
-        """Check if user exists in database. Thread-safe."""
+        """Check if user exists in database. Thread-safe; recently seen users skip the query."""
+        if self._live_users.get(telegram_id):
+            return True
+        
         session = self.session
         try:
             user = session.query(User).filter_by(telegram_id=telegram_id).first()
-            return user is not None
+            if user is None:
+                return False
+            self._live_users.set(telegram_id, True)
+            return True
         except Exception:
             return False
         finally:
@@ -419,6 +513,8 @@ class Database:
                 # Cascade delete will handle expenses, reminders, and incomes
                 session.delete(user)
                 session.commit()
+                self._invalidate_user(telegram_id)
+                self._live_users.pop(telegram_id)
                 return True
             return False
         except Exception:
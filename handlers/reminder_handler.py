@@ -10,15 +10,83 @@ import re
 import logging
 from datetime import datetime, timedelta, timezone
 import pytz
+import orjson
 from database import Database
 from ai_functions import deepseek_ai_reminder
 from translations import get_translation
 from keyboards import create_back_keyboard
 from voice_transcriber import VoiceTranscriber
 from timezonefinderL import TimezoneFinder
+from cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
+# restcountries.com answers by country text, so repeated names skip the HTTP call.
+# Only definite answers are cached (_RESTCOUNTRIES_NO_MATCH for a known miss);
+# network errors are retried next time. The AI fallback has its own cache in
+# ai_functions.deepseek_ai_country
+_restcountries_cache = LRUCache(maxsize=2048, ttl=86400)
+_RESTCOUNTRIES_NO_MATCH = object()
+_RESTCOUNTRIES_CAPITAL_TZ = {
+    "washington": "America/New_York",
+    "london": "Europe/London",
+    "beijing": "Asia/Shanghai",
+    "tokyo": "Asia/Tokyo",
+    "new delhi": "Asia/Kolkata",
+    "moscow": "Europe/Moscow",
+    "berlin": "Europe/Berlin",
+    "paris": "Europe/Paris",
+    "madrid": "Europe/Madrid",
+    "rome": "Europe/Rome",
+    "tashkent": "Asia/Tashkent",
+}
+
+# Manual time-parsing patterns, compiled once per language
+_RELATIVE_TIME_PATTERNS_BASE = (
+    (re.compile(r'after\s+(\d+)\s+minutes?'), 'minutes'),
+    (re.compile(r'in\s+(\d+)\s+minutes?'), 'minutes'),
+    (re.compile(r'after\s+(\d+)\s+hours?'), 'hours'),
+    (re.compile(r'in\s+(\d+)\s+hours?'), 'hours'),
+    (re.compile(r'after\s+(\d+)\s+days?'), 'days'),
+    (re.compile(r'in\s+(\d+)\s+days?'), 'days'),
+)
+_RELATIVE_TIME_PATTERNS = {
+    "en": _RELATIVE_TIME_PATTERNS_BASE,
+    "ru": _RELATIVE_TIME_PATTERNS_BASE + (
+        (re.compile(r'через\s+(\d+)\s+минут'), 'minutes'),
+        (re.compile(r'через\s+(\d+)\s+час'), 'hours'),
+        (re.compile(r'через\s+(\d+)\s+дн'), 'days'),
+    ),
+    "uz": _RELATIVE_TIME_PATTERNS_BASE + (
+        (re.compile(r'(\d+)\s+минутдан\s+кейин'), 'minutes'),
+        (re.compile(r'(\d+)\s+соатдан\s+кейин'), 'hours'),
+        (re.compile(r'(\d+)\s+кундан\s+кейин'), 'days'),
+    ),
+}
+_CLOCK_TIME_RE = re.compile(r'(\d{1,2}):(\d{2})')
+_TOMORROW_KEYWORDS = {
+    "uz": ("ertaga", "ertasi"),
+    "ru": ("завтра",),
+    "en": ("tomorrow",)
+}
+
+# Reminder message cleanup: relative time expressions, then common time words
+_MESSAGE_RELATIVE_BASE = r'after\s+\d+\s+(?:minutes?|hours?|days?)\s*|in\s+\d+\s+(?:minutes?|hours?|days?)\s*'
+_MESSAGE_RELATIVE_RE = {
+    "en": re.compile(_MESSAGE_RELATIVE_BASE, re.IGNORECASE),
+    "ru": re.compile(_MESSAGE_RELATIVE_BASE + r'|через\s+\d+\s+(?:минут|час|дн)\s*', re.IGNORECASE),
+    "uz": re.compile(_MESSAGE_RELATIVE_BASE + r'|\d+\s+(?:минутдан|соатдан|кундан)\s+кейин\s*', re.IGNORECASE),
+}
+_MESSAGE_TIME_WORDS = {
+    "uz": ("ertaga", "ertasi", "soat", "da", "da eslat"),
+    "ru": ("завтра", "в", "часов", "напомнить"),
+    "en": ("tomorrow", "at", "remind", "me", "after", "in")
+}
+_MESSAGE_TIME_WORDS_RE = {
+    lang: re.compile(r'\b(?:' + '|'.join(map(re.escape, words)) + r')\b', re.IGNORECASE)
+    for lang, words in _MESSAGE_TIME_WORDS.items()
+}
+
 
 def format_reminder_time(dt: datetime, language: str = "en") -> str:
     """
@@ -156,37 +224,9 @@ def get_timezone_from_country(country_name: str, language: str = "en") -> str:
             return tz_name
     
     # Try API lookup as fallback (before AI)
-    try:
-        import requests
-        url = f"https://restcountries.com/v3.1/name/{country_name}"
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            if data and len(data) > 0:
-                # Get capital city and try to get timezone
-                capital = data[0].get('capital', [])
-                if capital:
-                    # Use a simple mapping for capital cities
-                    capital_tz_map = {
-                        "washington": "America/New_York",
-                        "london": "Europe/London",
-                        "beijing": "Asia/Shanghai",
-                        "tokyo": "Asia/Tokyo",
-                        "new delhi": "Asia/Kolkata",
-                        "moscow": "Europe/Moscow",
-                        "berlin": "Europe/Berlin",
-                        "paris": "Europe/Paris",
-                        "madrid": "Europe/Madrid",
-                        "rome": "Europe/Rome",
-                        "tashkent": "Asia/Tashkent",
-                    }
-                    capital_lower = capital[0].lower()
-                    if capital_lower in capital_tz_map:
-                        tz_name = capital_tz_map[capital_lower]
-                        logger.info(f"Detected timezone {tz_name} from country capital: {capital[0]}")
-                        return tz_name
-    except Exception as e:
-        logger.debug(f"Error looking up country via API: {e}")
+    tz_name = _restcountries_timezone(country_name)
+    if tz_name:
+        return tz_name
     
     # Final fallback: Use AI to detect country from any language
     try:
@@ -202,6 +242,39 @@ def get_timezone_from_country(country_name: str, language: str = "en") -> str:
     return None
 
 
+def _restcountries_timezone(country_name: str):
+    """Timezone of the country's capital via restcountries.com, or None."""
+    cache_key = " ".join(country_name.casefold().split())
+    cached = _restcountries_cache.get(cache_key)
+    if cached is _RESTCOUNTRIES_NO_MATCH:
+        return None
+    if cached is not None:
+        return cached
+    
+    try:
+        import requests
+        url = f"https://restcountries.com/v3.1/name/{country_name}"
+        response = requests.get(url, timeout=5)
+        if response.status_code == 404:
+            _restcountries_cache.set(cache_key, _RESTCOUNTRIES_NO_MATCH)
+            return None
+        if response.status_code != 200:
+            return None
+        
+        data = orjson.loads(response.content)
+        capital = data[0].get('capital', []) if data else []
+        tz_name = _RESTCOUNTRIES_CAPITAL_TZ.get(capital[0].lower()) if capital else None
+        if tz_name:
+            logger.info(f"Detected timezone {tz_name} from country capital: {capital[0]}")
+            _restcountries_cache.set(cache_key, tz_name)
+        else:
+            _restcountries_cache.set(cache_key, _RESTCOUNTRIES_NO_MATCH)
+        return tz_name
+    except Exception as e:
+        logger.debug(f"Error looking up country via API: {e}")
+        return None
+
+
 def get_user_timezone(user, message=None, db=None):
     """
     Get user's timezone. Tries to detect from location first, then falls back to language.
@@ -501,32 +574,9 @@ class ReminderHandler:
         text_lower = text.lower()
         
         # Handle relative time expressions first
-        # Pattern: "after X minutes/hours" or "in X minutes/hours"
-        relative_patterns = [
-            (r'after\s+(\d+)\s+minutes?', 'minutes'),
-            (r'in\s+(\d+)\s+minutes?', 'minutes'),
-            (r'after\s+(\d+)\s+hours?', 'hours'),
-            (r'in\s+(\d+)\s+hours?', 'hours'),
-            (r'after\s+(\d+)\s+days?', 'days'),
-            (r'in\s+(\d+)\s+days?', 'days'),
-        ]
-        
-        # Also check for language-specific patterns
-        if language == "ru":
-            relative_patterns.extend([
-                (r'через\s+(\d+)\s+минут', 'minutes'),
-                (r'через\s+(\d+)\s+час', 'hours'),
-                (r'через\s+(\d+)\s+дн', 'days'),
-            ])
-        elif language == "uz":
-            relative_patterns.extend([
-                (r'(\d+)\s+минутдан\s+кейин', 'minutes'),
-                (r'(\d+)\s+соатдан\s+кейин', 'hours'),
-                (r'(\d+)\s+кундан\s+кейин', 'days'),
-            ])
-        
-        for pattern, unit in relative_patterns:
-            match = re.search(pattern, text_lower)
+        # Pattern: "after X minutes/hours" or "in X minutes/hours", plus language-specific forms
+        for pattern, unit in _RELATIVE_TIME_PATTERNS.get(language, _RELATIVE_TIME_PATTERNS_BASE):
+            match = pattern.search(text_lower)
             if match:
                 value = int(match.group(1))
                 if unit == 'minutes':
@@ -543,20 +593,13 @@ class ReminderHandler:
                 return remind_time_user.astimezone(timezone.utc).replace(tzinfo=None)
         
         # Look for time patterns (HH:MM or H:MM)
-        time_pattern = re.search(r'(\d{1,2}):(\d{2})', text)
+        time_pattern = _CLOCK_TIME_RE.search(text)
         if time_pattern:
             hour = int(time_pattern.group(1))
             minute = int(time_pattern.group(2))
             
             # Check for "tomorrow" keywords
-            tomorrow_keywords = {
-                "uz": ["ertaga", "ertasi"],
-                "ru": ["завтра"],
-                "en": ["tomorrow"]
-            }
-            
-            keywords = tomorrow_keywords.get(language, [])
-            is_tomorrow = any(kw in text_lower for kw in keywords)
+            is_tomorrow = any(kw in text_lower for kw in _TOMORROW_KEYWORDS.get(language, ()))
             
             if is_tomorrow:
                 remind_time_user = (now_user_tz + timedelta(days=1)).replace(hour=hour, minute=minute, second=0, microsecond=0)
@@ -577,36 +620,16 @@ class ReminderHandler:
         result = text
         
         # Remove relative time expressions
-        relative_patterns = [
-            r'after\s+\d+\s+(?:minutes?|hours?|days?)\s*',
-            r'in\s+\d+\s+(?:minutes?|hours?|days?)\s*',
-        ]
-        
-        if language == "ru":
-            relative_patterns.extend([
-                r'через\s+\d+\s+(?:минут|час|дн)\s*',
-            ])
-        elif language == "uz":
-            relative_patterns.extend([
-                r'\d+\s+(?:минутдан|соатдан|кундан)\s+кейин\s*',
-            ])
-        
-        for pattern in relative_patterns:
-            result = re.sub(pattern, '', result, flags=re.IGNORECASE)
+        relative_re = _MESSAGE_RELATIVE_RE.get(language, _MESSAGE_RELATIVE_RE["en"])
+        result = relative_re.sub('', result)
         
         # Remove common time words
-        time_words = {
-            "uz": ["ertaga", "ertasi", "soat", "da", "da eslat"],
-            "ru": ["завтра", "в", "часов", "напомнить"],
-            "en": ["tomorrow", "at", "remind", "me", "after", "in"]
-        }
-        
-        words = time_words.get(language, [])
-        for word in words:
-            result = re.sub(rf'\b{word}\b', '', result, flags=re.IGNORECASE)
+        time_words_re = _MESSAGE_TIME_WORDS_RE.get(language)
+        if time_words_re:
+            result = time_words_re.sub('', result)
         
         # Remove time patterns
-        result = re.sub(r'\d{1,2}:\d{2}', '', result)
+        result = _CLOCK_TIME_RE.sub('', result)
         
         return result.strip()
 
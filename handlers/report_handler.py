@@ -44,22 +44,20 @@ class ReportHandler:
         # This is kept for backward compatibility but should not be called
         pass
     
-    def generate_report(self, user_id: int, start_date=None, end_date=None, language: str = "en"):
-        """Generate and return report for given date range."""
+    def generate_report(self, user_id: int, start_date=None, end_date=None, language: str = "en", on_progress=None):
+        """
+        Generate and return report for given date range.
+        
+        on_progress, if given, receives the sanitized partial report text while the AI writes it.
+        """
         try:
-            # Get user's expenses and incomes from database with date filters
-            expenses = self.db.get_expenses(user_id, start_date=start_date, end_date=end_date, limit=1000)
-            incomes = self.db.get_incomes(user_id, start_date=start_date, end_date=end_date, limit=1000)
-            
-            # Calculate totals
-            total_expenses = sum(e.amount for e in expenses) if expenses else 0
-            total_income = sum(i.amount for i in incomes) if incomes else 0
+            # Totals are aggregated by the database; only recent records are loaded
+            totals = self.db.get_financial_summary(user_id, start_date=start_date, end_date=end_date)
+            total_expenses = totals["expense_total"]
+            total_income = totals["income_total"]
             balance = total_income - total_expenses
             
-            # Prepare context for AI report
-            all_data = list(expenses) + list(incomes) if expenses or incomes else []
-            
-            if not all_data:
+            if not totals["expense_count"] and not totals["income_count"]:
                 no_data_msg = {
                     "uz": "Bu davr uchun ma'lumotlar topilmadi.",
                     "ru": "Данные за этот период не найдены.",
@@ -83,8 +81,16 @@ class ReportHandler:
             }
             report_query = report_queries.get(language, report_queries["en"])
             
+            # Recent records for the AI context (the report shows the latest 10 of each)
+            expenses = self.db.get_expenses(user_id, start_date=start_date, end_date=end_date, limit=10)
+            incomes = self.db.get_incomes(user_id, start_date=start_date, end_date=end_date, limit=10)
+            all_data = list(expenses) + list(incomes)
+            
             # Pass user's currency to report function
-            report = deepseek_ai_report(report_query, language, all_data, user_currency=currency)
+            progress = (lambda partial: on_progress(self._sanitize_report_text(partial))) if on_progress else None
+            report = deepseek_ai_report(
+                report_query, language, all_data, user_currency=currency, summary=totals, on_progress=progress
+            )
             
             # Create summary in user's language
             summary = ""
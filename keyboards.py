@@ -1,12 +1,17 @@
 """
 Keyboard creation utilities for SmartExpenseBot.
+
+Keyboards depend only on the language, so each one is built once and the same
+markup object is reused for every send. Callers must not modify them.
 """
 
 import telebot
+from functools import lru_cache
 from telebot import types
 from translations import get_translation
 
 
+@lru_cache(maxsize=16)
 def create_main_keyboard(language: str) -> types.ReplyKeyboardMarkup:
     """Create main menu keyboard."""
     keyboard = types.ReplyKeyboardMarkup(resize_keyboard=True, row_width=2)
@@ -27,6 +32,7 @@ def create_main_keyboard(language: str) -> types.ReplyKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=16)
 def create_language_keyboard() -> types.InlineKeyboardMarkup:
     """Create language selection keyboard."""
     keyboard = types.InlineKeyboardMarkup(row_width=1)
@@ -38,6 +44,7 @@ def create_language_keyboard() -> types.InlineKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=16)
 def create_confirm_keyboard(language: str) -> types.InlineKeyboardMarkup:
     """Create confirmation keyboard with Yes/No buttons."""
     keyboard = types.InlineKeyboardMarkup(row_width=2)
@@ -48,6 +55,7 @@ def create_confirm_keyboard(language: str) -> types.InlineKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=16)
 def create_back_keyboard(language: str) -> types.ReplyKeyboardMarkup:
     """Create keyboard with back button."""
     keyboard = types.ReplyKeyboardMarkup(resize_keyboard=True, row_width=1)
@@ -57,6 +65,7 @@ def create_back_keyboard(language: str) -> types.ReplyKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=16)
 def create_donate_keyboard(language: str) -> types.InlineKeyboardMarkup:
     """Create donation keyboard with all donation options."""
     keyboard = types.InlineKeyboardMarkup(row_width=1)
@@ -86,6 +95,7 @@ def create_donate_keyboard(language: str) -> types.InlineKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=16)
 def create_about_keyboard() -> types.InlineKeyboardMarkup:
     """Create about page keyboard."""
     keyboard = types.InlineKeyboardMarkup(row_width=1)
@@ -96,6 +106,7 @@ def create_about_keyboard() -> types.InlineKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=16)
 def create_currency_keyboard(language: str) -> types.InlineKeyboardMarkup:
     """Create currency selection keyboard."""
     keyboard = types.InlineKeyboardMarkup(row_width=2)
@@ -110,6 +121,7 @@ def create_currency_keyboard(language: str) -> types.InlineKeyboardMarkup:
     return keyboard
 
 
+@lru_cache(maxsize=16)
 def create_report_keyboard(language: str) -> types.InlineKeyboardMarkup:
     """Create report period selection keyboard."""
     keyboard = types.InlineKeyboardMarkup(row_width=2)
@@ -0,0 +1,107 @@
+"""Tests for the local (non-API) parsing paths in ai_functions."""
+
+from datetime import datetime
+
+import pytest
+
+from ai_functions import (
+    _detect_currency,
+    _extract_expense_manually,
+    _extract_income_manually,
+    _parse_reminder_locally,
+    _try_fast_extract,
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("taxi 5 usd", "USD"),
+    ("5usd taxi", "USD"),
+    ("20eur lunch", "EUR"),
+    ("100som taxi", "UZS"),
+    ("100 so'm", "UZS"),
+    ("100 rubl", "RUB"),
+    ("300 rubles", "RUB"),
+    ("10 dollars", "USD"),
+    ("$5 coffee", "USD"),
+    ("coffee 5$", "USD"),
+    ("¥30 noodles", "CNY"),
+    ("€12 lunch", "EUR"),
+    ("bought some bread 5 usd", "USD"),
+    ("awesome taxi 10 dollars", "USD"),
+])
+def test_detect_currency(text, expected):
+    assert _detect_currency(text.lower(), "XXX") == expected
+
+
+@pytest.mark.parametrize("text", [
+    "pizza 20 with someone",
+    "burger 5 at awesome cafe",
+    "taxi 10 to europe",
+    "book 15 about rubber",
+    "5 at the dollarstore",
+])
+def test_detect_currency_ignores_keywords_inside_words(text):
+    assert _detect_currency(text.lower(), "XXX") == "XXX"
+
+
+def test_manual_fallbacks_use_default_without_currency():
+    assert _extract_expense_manually("lunch 12 at the dollarstore", "en", "UZS")["currency"] == "UZS"
+    assert _extract_income_manually("salary 500 from someone", "en", "EUR")["currency"] == "EUR"
+
+
+def test_manual_fallbacks_detect_digit_glued_currency():
+    assert _extract_expense_manually("20eur lunch", "en")["currency"] == "EUR"
+    assert _extract_income_manually("5usd taxi", "en", "UZS")["currency"] == "USD"
+
+
+@pytest.mark.parametrize("text, currency, category", [
+    ("taxi 5 usd", "USD", "Transport"),
+    ("taxi 5usd", "USD", "Transport"),
+    ("pizza $12", "USD", "Food"),
+    ("book 30 euros", "EUR", "Education"),
+])
+def test_fast_extract_simple_expenses(text, currency, category):
+    expense = _try_fast_extract(text)
+    assert expense is not None
+    assert (expense["currency"], expense["category"]) == (currency, category)
+
+
+@pytest.mark.parametrize("text", [
+    "pizza 20 with someone",
+    "burger 5 at awesome cafe",
+    "taxi 10 to europe",
+    "book 15 about rubber",
+    "taxi 5 at the dollarstore",
+    "taxi 5 usd and pizza 3 eur",  # more than one number
+    "taxi 5 usd 3 eur",
+    "theater 5 usd",  # "eat" only inside a word, so no category
+])
+def test_fast_extract_leaves_ambiguous_text_to_the_api(text):
+    assert _try_fast_extract(text) is None
+
+
+NOW = datetime(2026, 10, 15, 22, 0)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("in 15 minutes", "2026-10-15 22:15:00"),
+    ("через 2 часа", "2026-10-16 00:00:00"),
+    ("30 daqiqadan keyin", "2026-10-15 22:30:00"),
+    ("tomorrow 9am", "2026-10-16 09:00:00"),
+    ("2026-10-20 14:30", "2026-10-20 14:30:00"),
+])
+def test_parse_reminder_locally(text, expected):
+    assert _parse_reminder_locally(text, NOW) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "in 2 days at 10:00",
+    "через 2 дня в 9:00",
+    "call dentist in 3 days at 9am",
+    "2026-10-20 14:30 in 5 minutes",
+    "через 2 дня в 9",
+    "yana 2 kun soat 9 da",
+    "in 2 hours 30 minutes",
+])
+def test_parse_reminder_locally_defers_mixed_times(text):
+    assert _parse_reminder_locally(text, NOW) is None
@@ -0,0 +1,68 @@
+"""Tests for the LRUCache used by the bot's in-process caches."""
+
+import pytest
+
+import cache
+from cache import LRUCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable replacement for time.monotonic inside cache.py."""
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_get_returns_default_for_missing_key():
+    lru = LRUCache(maxsize=2)
+    assert lru.get("missing") is None
+    assert lru.get("missing", "fallback") == "fallback"
+
+
+def test_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")  # "a" is now more recent than "b"
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+    assert len(lru) == 2
+
+
+def test_entries_expire_after_ttl(clock):
+    lru = LRUCache(maxsize=10, ttl=60)
+    lru.set("k", "v")
+    clock[0] += 59
+    assert lru.get("k") == "v"
+    clock[0] += 1
+    assert lru.get("k") is None
+    assert len(lru) == 0
+
+
+def test_per_entry_ttl_overrides_default(clock):
+    lru = LRUCache(maxsize=10, ttl=600)
+    lru.set("short", 1, ttl=30)
+    lru.set("long", 2)
+    clock[0] += 31
+    assert lru.get("short") is None
+    assert lru.get("long") == 2
+
+
+def test_without_ttl_entries_do_not_expire(clock):
+    lru = LRUCache(maxsize=10)
+    lru.set("k", "v")
+    clock[0] += 10 ** 9
+    assert lru.get("k") == "v"
+
+
+def test_pop_and_clear():
+    lru = LRUCache(maxsize=10)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.pop("a") == 1
+    assert lru.pop("a", "gone") == "gone"
+    lru.clear()
+    assert len(lru) == 0
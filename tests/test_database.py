@@ -0,0 +1,58 @@
+"""Tests for the user cache in Database.get_or_create_user."""
+
+import pytest
+
+from config import Config
+from database import Database, UserSnapshot
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "DB_TYPE", "sqlite")
+    monkeypatch.setattr(Config, "SQLITE_DB_PATH", str(tmp_path / "bot.db"))
+    db = Database()
+    yield db
+    db.close()
+
+
+def test_returns_cached_immutable_snapshot(db):
+    user = db.get_or_create_user(1, "Ann")
+    assert isinstance(user, UserSnapshot)
+    assert db.get_or_create_user(1, "Ann") is user
+    with pytest.raises(AttributeError):
+        user.language = "ru"
+
+
+def test_updates_invalidate_cached_user(db):
+    db.get_or_create_user(1, "Ann")
+    db.update_user_language(1, "ru")
+    db.update_user_timezone(1, "Asia/Tashkent")
+    db.update_user_currency(1, "UZS")
+    user = db.get_or_create_user(1, "Ann")
+    assert (user.language, user.timezone, user.currency) == ("ru", "Asia/Tashkent", "UZS")
+
+
+def test_read_racing_an_update_is_not_cached(db, monkeypatch):
+    db.get_or_create_user(1, "Ann")
+    db._user_cache.clear()
+    from_user = UserSnapshot.from_user.__func__
+
+    def read_then_update(cls, user):
+        # Snapshot the row as read, then let another write commit before it is cached
+        snapshot = from_user(cls, user)
+        monkeypatch.setattr(UserSnapshot, "from_user", classmethod(from_user))
+        db.update_user_language(1, "uz")
+        return snapshot
+
+    monkeypatch.setattr(UserSnapshot, "from_user", classmethod(read_then_update))
+    assert db.get_or_create_user(1, "Ann").language == "en"
+    assert db.get_or_create_user(1, "Ann").language == "uz"
+
+
+def test_user_exists_follows_delete(db):
+    assert not db.user_exists(1)
+    db.get_or_create_user(1, "Ann")
+    assert db.user_exists(1)
+    db.delete_user(1)
+    assert not db.user_exists(1)
+    assert db.get_or_create_user(1, "Ann").language == "en"
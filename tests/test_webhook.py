@@ -0,0 +1,84 @@
+"""Tests for the webhook server's request checks and webhook configuration."""
+
+import threading
+
+import orjson
+import pytest
+import requests
+
+pytest.importorskip("telebot")
+
+from config import Config
+from webhook import SECRET_HEADER, create_webhook_server
+
+SECRET = "s3cr3t-token"
+UPDATE = {"update_id": 1, "message": {
+    "message_id": 1, "date": 0, "chat": {"id": 5, "type": "private"},
+    "from": {"id": 5, "is_bot": False, "first_name": "A"}, "text": "hi",
+}}
+
+
+class FakeBot:
+    def __init__(self):
+        self.updates = []
+
+    def process_new_updates(self, updates):
+        self.updates.extend(updates)
+
+
+@pytest.fixture
+def server():
+    bot = FakeBot()
+    httpd = create_webhook_server(bot, "https://bot.example.com/hook", SECRET, "127.0.0.1", 0)
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield bot, f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def post(base, path="/hook", body=orjson.dumps(UPDATE), secret=SECRET):
+    headers = {SECRET_HEADER: secret} if secret is not None else {}
+    return requests.post(base + path, data=body, headers=headers, timeout=5)
+
+
+def test_accepts_update_with_secret(server):
+    bot, base = server
+    assert post(base).status_code == 200
+    assert [update.update_id for update in bot.updates] == [1]
+
+
+@pytest.mark.parametrize("secret", [None, "", "wrong", SECRET + "x"])
+def test_rejects_missing_or_wrong_secret(server, secret):
+    bot, base = server
+    assert post(base, secret=secret).status_code == 403
+    assert bot.updates == []
+
+
+def test_rejects_unknown_path(server):
+    bot, base = server
+    assert post(base, path="/other").status_code == 404
+    assert bot.updates == []
+
+
+@pytest.mark.parametrize("body", [b"", b"not json", b"[]", b'{"message": {}}', b"\xff\xfe"])
+def test_rejects_malformed_body(server, body):
+    bot, base = server
+    assert post(base, body=body).status_code == 400
+    assert bot.updates == []
+
+
+def test_refuses_empty_secret():
+    with pytest.raises(ValueError):
+        create_webhook_server(FakeBot(), "https://bot.example.com/hook", "", "127.0.0.1", 0)
+
+
+def test_config_requires_secret_in_webhook_mode(monkeypatch):
+    monkeypatch.setattr(Config, "BOT_TOKEN", "token")
+    monkeypatch.setattr(Config, "DEEPSEEK_API_KEY", "key")
+    monkeypatch.setattr(Config, "WEBHOOK_URL", "https://bot.example.com/hook")
+    monkeypatch.setattr(Config, "WEBHOOK_SECRET", "")
+    with pytest.raises(ValueError):
+        Config.validate()
+    monkeypatch.setattr(Config, "WEBHOOK_SECRET", SECRET)
+    assert Config.validate()
@@ -4,7 +4,7 @@ Supports Uzbek, Russian, and English.
 """
 
 import os
-import json
+import orjson
 import subprocess
 import logging
 import threading
@@ -144,12 +144,12 @@ class VoiceTranscriber:
                     chunk_count += 1
                     
                     if rec.AcceptWaveform(data):
-                        result = json.loads(rec.Result())
+                        result = orjson.loads(rec.Result())
                         if "text" in result:
                             text_parts.append(result["text"])
             
             # Get final result
-            final_result = json.loads(rec.FinalResult())
+            final_result = orjson.loads(rec.FinalResult())
             if "text" in final_result:
                 text_parts.append(final_result["text"])
             
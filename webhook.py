@@ -0,0 +1,61 @@
+"""
+Webhook server for SmartExpenseBot.
+Receives Telegram updates over plain HTTP (behind a TLS proxy) and hands them to the bot.
+"""
+
+import hmac
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+import telebot
+from telebot import types
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def create_webhook_server(bot: telebot.TeleBot, url: str, secret: str, listen: str, port: int) -> ThreadingHTTPServer:
+    """
+    Build an HTTP server that accepts Telegram webhook POSTs for url's path.
+
+    Every request must carry secret in the X-Telegram-Bot-Api-Secret-Token
+    header; an empty secret is refused because the listener would then accept
+    forged updates from anyone who can reach it.
+    """
+    if not secret:
+        raise ValueError("A webhook secret is required")
+    path = urlsplit(url).path or "/"
+    expected_secret = secret.encode()
+
+    class WebhookRequestHandler(BaseHTTPRequestHandler):
+        """Accept Telegram webhook POSTs and hand the update to the bot's worker pool."""
+
+        def do_POST(self):
+            if self.path != path:
+                self.send_error(404)
+                return
+            if not hmac.compare_digest(self.headers.get(SECRET_HEADER, "").encode(), expected_secret):
+                self.send_error(403)
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                update = types.Update.de_json(self.rfile.read(length).decode("utf-8"))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                # Bad length, undecodable or non-JSON body, or JSON that is not an Update
+                update = None
+            if update is None:
+                self.send_error(400)
+                return
+
+            # Threaded TeleBot only queues the handlers here, so Telegram gets its 200 immediately
+            # instead of waiting on (and retrying during) slow AI or voice handlers
+            bot.process_new_updates([update])
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            logger.debug("Webhook request: " + format, *args)
+
+    return ThreadingHTTPServer((listen, port), WebhookRequestHandler)